@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import collections
+import concurrent.futures
 import functools
 import logging
 import random
 import secrets
+import threading
+import time
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
@@ -22,6 +25,7 @@ import Utils
 
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
+    from Profiling import GenerationProfiler
     from rule_builder.rules import Rule
     from worlds import AutoWorld
 
@@ -39,13 +43,26 @@ class Group(TypedDict):
 
 
 class ThreadBarrierProxy:
-    """Passes through getattr while passthrough is True"""
+    """Passes through getattr while passthrough is True and the current thread is not blocked"""
     def __init__(self, obj: object) -> None:
         self.passthrough = True
         self.obj = obj
+        self.thread_state = threading.local()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # which threads are blocked is not part of a copy
+        return {"passthrough": self.passthrough, "obj": self.obj}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.thread_state = threading.local()
+
+    def block_current_thread(self, blocked: bool = True) -> None:
+        """Blocks or unblocks access only for the thread calling this, regardless of passthrough"""
+        self.thread_state.blocked = blocked
 
     def __getattr__(self, name: str) -> Any:
-        if self.passthrough:
+        if self.passthrough and not getattr(self.thread_state, "blocked", False):
             return getattr(self.obj, name)
         else:
             raise RuntimeError("You are in a threaded context and global random state was removed for your safety. "
@@ -75,7 +92,7 @@ class MultiWorld():
     worlds: Dict[int, "AutoWorld.World"]
     groups: Dict[int, Group]
     regions: RegionManager
-    itempool: List[Item]
+    _itempool: List[Item]
     is_race: bool = False
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
@@ -99,6 +116,14 @@ class MultiWorld():
 
     game: Dict[int, str]
 
+    stage_executor: Optional[concurrent.futures.Executor] = None
+    """When set, the steps worlds declared as `World.isolated_stages` are run concurrently using this executor.
+    This only makes them faster on free-threaded Python builds, otherwise the GIL still runs one step at a time."""
+    profiler: Optional[GenerationProfiler] = None
+    """When set, stage timings are recorded into this profiler."""
+    sphere_cache: Optional[SphereCache] = None
+    """Spheres of all filled locations, recorded by `cache_spheres`."""
+
     random: random.Random
     per_slot_randoms: Utils.DeprecateDict[int, random.Random]
     """Deprecated. Please use `self.random` instead."""
@@ -147,9 +172,22 @@ class MultiWorld():
         def __len__(self):
             return sum(len(regions) for regions in self.region_cache.values())
 
+    @property
+    def itempool(self) -> List[Item]:
+        """The items to be placed. Threads running isolated steps of a world only see the items of that world."""
+        return getattr(self._thread_itempool, "items", self._itempool)
+
+    @itempool.setter
+    def itempool(self, value: List[Item]) -> None:
+        if hasattr(self._thread_itempool, "items"):
+            self._thread_itempool.items = value
+        else:
+            self._itempool = value
+
     def __init__(self, players: int):
         # world-local random state is saved for multiple generations running concurrently
         self.random = ThreadBarrierProxy(random.Random())
+        self._thread_itempool = threading.local()
         self.players = players
         self.player_types = {player: NetUtils.SlotType.player for player in self.player_ids}
         self.algorithm = 'balanced'
@@ -180,6 +218,21 @@ class MultiWorld():
         self.per_slot_randoms = Utils.DeprecateDict("Using per_slot_randoms is now deprecated. Please use the "
                                                     "world's random object instead (usually self.random)", True)
         self.plando_options = PlandoOptions.none
+        self._sphere_cache_lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # thread local data, locks and executors can't be copied, a copy runs its steps on the thread calling them
+        # and is not profiled
+        state = self.__dict__.copy()
+        del state["_thread_itempool"], state["_sphere_cache_lock"]
+        state.pop("stage_executor", None)
+        state.pop("profiler", None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._thread_itempool = threading.local()
+        self._sphere_cache_lock = threading.Lock()
 
     def get_all_ids(self) -> Tuple[int, ...]:
         return self.player_ids + tuple(self.groups)
@@ -498,6 +551,7 @@ class MultiWorld():
     def push_item(self, location: Location, item: Item, collect: bool = True):
         location.item = item
         item.location = location
+        self.clear_sphere_cache()
         if collect:
             self.state.collect(item, location.advancement, location)
 
@@ -609,14 +663,30 @@ class MultiWorld():
                 state.collect(location.item, True, location)
             locations -= sphere
 
-    def get_sendable_spheres(self) -> Iterator[Set[Location]]:
+    def cache_spheres(self) -> SphereCache:
         """
-        yields a set of multiserver sendable locations (location.item.code: int) for each logical sphere
+        Walks through the spheres of all filled locations once and keeps the result in `sphere_cache`, so that
+        `get_sendable_spheres` and `fulfills_accessibility` reuse it instead of each walking through all locations
+        again. Events are collected as soon as they are reachable.
 
-        If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
-        and then a set of all of the unreachable locations.
+        Later calls return the existing cache, until `clear_sphere_cache` is called. `push_item`,
+        `Location.place_locked_item` and `Fill.swap_location_item` do so, code that changes placements in other ways
+        after spheres were cached has to call it itself.
         """
+        with self._sphere_cache_lock:
+            if self.sphere_cache is None:
+                self.sphere_cache = self._record_spheres()
+            return self.sphere_cache
+
+    def clear_sphere_cache(self) -> None:
+        """Discards the spheres recorded by `cache_spheres`, as placements changed."""
+        if self.sphere_cache is not None:
+            with self._sphere_cache_lock:
+                self.sphere_cache = None
+
+    def _record_spheres(self) -> SphereCache:
         state = CollectionState(self)
+        spheres: List[Set[Location]] = []
         locations: Set[Location] = set()
         events: Set[Location] = set()
         for location in self.get_filled_locations():
@@ -625,9 +695,7 @@ class MultiWorld():
             else:
                 events.add(location)
 
-        while locations:
-            sphere: Set[Location] = set()
-
+        while True:
             # cull events out
             done_events: Set[Union[Location, None]] = {None}
             while done_events:
@@ -638,23 +706,41 @@ class MultiWorld():
                         done_events.add(event)
                 events -= done_events
 
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
+            sphere = {location for location in locations if location.can_reach(state)}
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
                 break
-
+            spheres.append(sphere)
             for location in sphere:
                 state.collect(location.item, True, location)
             locations -= sphere
 
+        return SphereCache(spheres, locations | events, state)
+
+    def get_sendable_spheres(self) -> Iterator[Set[Location]]:
+        """
+        yields a set of multiserver sendable locations (location.item.code: int) for each logical sphere
+
+        If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
+        and then a set of all of the unreachable locations.
+        """
+        sphere_cache = self.sphere_cache or self._record_spheres()
+        yield from sphere_cache.spheres
+        unreachable = {location for location in sphere_cache.unreachable
+                       if type(location.item.code) is int and type(location.address) is int}
+        if unreachable:
+            yield set()  # end of reachable spheres
+            yield unreachable
+
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
-        """Check if accessibility rules are fulfilled with current or supplied state."""
+        """
+        Check if accessibility rules are fulfilled with current or supplied state.
+        Uses the final state of `sphere_cache` if it exists and no state is supplied.
+        """
+        cached_state = None
         if not state:
+            if self.sphere_cache is not None:
+                # the cached state is used again later, so checking accessibility must not modify it
+                cached_state = self.sphere_cache.state.copy()
             state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
@@ -685,6 +771,14 @@ class MultiWorld():
 
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if cached_state:
+            # everything reachable has already been collected, so only the unreachable locations are left
+            locations = [location for location in locations if not location.can_reach(cached_state)]
+            beatable_fulfilled = self.has_beaten_game(cached_state)
+            if all_done():
+                return True
+            state = cached_state
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -728,6 +822,8 @@ class CollectionState():
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     """Internal cache for Advancement Locations already checked by this CollectionState. Not for use in logic."""
+    reachability_items: Dict[int, Counter[str]]
+    """Internal snapshot of each player's prog_items as of their last region update. Not for use in logic."""
     stale: Dict[int, bool]
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
@@ -742,6 +838,7 @@ class CollectionState():
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
+        self.reachability_items = {}
         self.stale = {player: True for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
@@ -754,19 +851,52 @@ class CollectionState():
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        blocked_connections = self.blocked_connections[player]
         start: Region = world.get_region(world.origin_region_name)
+        # Only rule caching worlds declare the dependencies of their access rules, for any other world comparing the
+        # items would only add overhead.
+        previous_items: Optional[Counter[str]] = None
+        current_items = self.prog_items[player]
+        if getattr(world, "rule_caching_enabled", False):
+            previous_items = self.reachability_items.get(player)
+            # Items can't change while searching, so any item collected by a reached_region hook is picked up next
+            # update.
+            self.reachability_items[player] = current_items.copy()
+
+        incremental = previous_items is not None and not self.allow_partial_entrances and start in reachable_regions
+        if incremental:
+            # Only connections whose access rule could have changed since the last update need to be checked again.
+            changed_items = {item for item, count in current_items.items() if previous_items[item] != count}
+            changed_items.update(previous_items.keys() - current_items.keys())
+            queue = deque(self._get_connections_to_recheck(player, changed_items, ()))
+        else:
+            queue = deque(blocked_connections)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
             reachable_regions.add(start)
-            self.blocked_connections[player].update(start.exits)
+            blocked_connections.update(start.exits)
             queue.extend(start.exits)
 
         if world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
-            self._update_reachable_regions_auto_indirect_conditions(player, queue)
+            self._update_reachable_regions_auto_indirect_conditions(player, queue, incremental)
+
+    def _get_connections_to_recheck(self, player: int, changed_items: AbstractSet[str],
+                                    new_regions: Collection[str]) -> List[Entrance]:
+        """
+        Returns the blocked connections of `player` that may have become accessible because of the changed items or the
+        newly reached regions. Connections with access rules that don't declare their dependencies are always returned.
+        """
+        connections: List[Entrance] = []
+        for connection in self.blocked_connections[player]:
+            dependencies = connection.get_reachability_dependencies()
+            if (dependencies is None
+                    or not dependencies.items.isdisjoint(changed_items)
+                    or not dependencies.regions.isdisjoint(new_regions)):
+                connections.append(connection)
+        return connections
 
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
@@ -795,13 +925,15 @@ class CollectionState():
                     relevant_entrances.difference_update(queue)
                     queue.extend(relevant_entrances)
 
-    def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance]):
+    def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance],
+                                                           incremental: bool = False):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
             new_connection = False
+            new_regions: Set[str] = set()
             while queue:
                 connection = queue.popleft()
                 new_region = connection.connected_region
@@ -817,9 +949,16 @@ class CollectionState():
                     queue.extend(new_region.exits)
                     self.path[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
+                    new_regions.add(new_region.name)
                     self.multiworld.worlds[player].reached_region(self, new_region)
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
-            queue.extend(blocked_connections)
+            if not new_connection:
+                break
+            if incremental:
+                # connections with declared dependencies only need a retry if they depend on a newly reached region
+                queue.extend(self._get_connections_to_recheck(player, (), new_regions))
+            else:
+                queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
         ret = CollectionState(self.multiworld)
@@ -831,6 +970,7 @@ class CollectionState():
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
+        ret.reachability_items = self.reachability_items.copy()
         ret.allow_partial_entrances = self.allow_partial_entrances
         for function in self.additional_copy_functions:
             ret = function(self, ret)
@@ -1145,6 +1285,7 @@ class CollectionState():
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.reachability_items.pop(item.player, None)
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1179,6 +1320,22 @@ CollectionRule = Callable[[CollectionState], bool]
 DEFAULT_COLLECTION_RULE: CollectionRule = staticmethod(lambda state: True)
 
 
+class ReachabilityDependencies(NamedTuple):
+    items: frozenset[str]
+    """Names of items of the same player that can change the result of an access rule"""
+    regions: frozenset[str]
+    """Names of regions of the same player that can change the result of an access rule"""
+
+
+class SphereCache(NamedTuple):
+    spheres: List[Set[Location]]
+    """Locations with multiserver sendable items in each sphere, reachable events are collected before each sphere"""
+    unreachable: Set[Location]
+    """Filled locations that could not be reached"""
+    state: CollectionState
+    """State after collecting all reachable locations"""
+
+
 class EntranceType(IntEnum):
     ONE_WAY = 1
     TWO_WAY = 2
@@ -1193,6 +1350,7 @@ class Entrance:
     connected_region: Optional[Region] = None
     randomization_group: int
     randomization_type: EntranceType
+    _reachability_dependencies: Optional[Tuple[CollectionRule, Optional[ReachabilityDependencies]]] = None
 
     def __init__(self, player: int, name: str = "", parent: Optional[Region] = None,
                  randomization_group: int = 0, randomization_type: EntranceType = EntranceType.ONE_WAY) -> None:
@@ -1211,6 +1369,36 @@ class Entrance:
 
         return False
 
+    def get_reachability_dependencies(self) -> Optional[ReachabilityDependencies]:
+        """
+        Returns the names of this player's items and regions that the access rule depends on, so that a blocked
+        Entrance only has to be checked again once one of them changes.
+        Returns None if the dependencies are unknown, in which case the Entrance is checked on every region update.
+        """
+        access_rule = self.access_rule
+        cached = self._reachability_dependencies
+        # the cache is keyed by the rule it was computed for, so assigning another rule invalidates it.
+        # Resolved rules are immutable, so the same rule always has the same dependencies.
+        if cached is not None and cached[0] is access_rule:
+            return cached[1]
+
+        from rule_builder.rules import Rule
+
+        dependencies: Optional[ReachabilityDependencies] = None
+        if type(self).can_reach is not Entrance.can_reach:
+            pass  # overridden reachability may depend on anything
+        elif access_rule is Entrance.access_rule:
+            dependencies = ReachabilityDependencies(frozenset(), frozenset())
+        elif isinstance(access_rule, Rule.Resolved) and access_rule.player == self.player \
+                and not access_rule.force_recalculate and self.parent_region \
+                and getattr(self.parent_region.multiworld.worlds[self.player], "rule_caching_enabled", False):
+            # only worlds that opted into rule caching guarantee that their rules declare all their dependencies
+            if not access_rule.location_dependencies() and not access_rule.entrance_dependencies():
+                dependencies = ReachabilityDependencies(frozenset(access_rule.item_dependencies()),
+                                                        frozenset(access_rule.region_dependencies()))
+        self._reachability_dependencies = (access_rule, dependencies)
+        return dependencies
+
     def connect(self, region: Region) -> None:
         self.connected_region = region
         region.entrances.append(self)
@@ -1515,6 +1703,8 @@ class Location:
         self.item = item
         item.location = self
         self.locked = True
+        if self.parent_region and self.parent_region.multiworld:
+            self.parent_region.multiworld.clear_sphere_cache()
 
     def __repr__(self):
         multiworld = self.parent_region.multiworld if self.parent_region and self.parent_region.multiworld else None
@@ -1710,6 +1900,7 @@ class Spoiler:
         state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
+        phase_start = time.perf_counter()
         while sphere_candidates:
 
             # build up spheres of collection radius.
@@ -1739,24 +1930,41 @@ class Spoiler:
                     self.unreachables = sphere_candidates
                     break
 
+        logging.debug('Calculated %i collection spheres in %.2f seconds.', len(collection_spheres),
+                      time.perf_counter() - phase_start)
+        phase_start = time.perf_counter()
+        sweeps = 0
+
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         required_locations = {location for sphere in collection_spheres for location in sphere}
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
             to_delete: Set[Location] = set()
+            # Locations of the same sphere are all collected in the first sweep, so if one of them holds an item that is
+            # required, any other one holding an identical item is just as required. Every other location still needs a
+            # sweep of its own, so this only saves the sweeps for duplicate items.
+            required_items: Set[Tuple[int, str, ItemClassification]] = set()
             for location in sphere:
+                item_key = location.item.player, location.item.name, location.item.classification
+                if item_key in required_items:
+                    continue
                 # we remove the location from required_locations to sweep from, and check if the game is still beatable
                 logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
                               location.item.player)
                 required_locations.remove(location)
+                sweeps += 1
                 if multiworld.can_beat_game(state_cache[num], required_locations):
                     to_delete.add(location)
                 else:
                     # still required, got to keep it around
                     required_locations.add(location)
+                    required_items.add(item_key)
 
             # cull entries in spheres for spoiler walkthrough at end
             sphere -= to_delete
+        logging.debug('Culled collection spheres down to %i required locations with %i sweeps in %.2f seconds.',
+                      len(required_locations), sweeps, time.perf_counter() - phase_start)
+        phase_start = time.perf_counter()
 
         # second phase, sphere 0
         removed_precollected: List[Item] = []
@@ -1776,6 +1984,9 @@ class Spoiler:
                 else:
                     removed_precollected.append(item)
 
+        logging.debug('Culled precollected items in %.2f seconds.', time.perf_counter() - phase_start)
+        phase_start = time.perf_counter()
+
         # we are now down to just the required progress items in collection_spheres. Unfortunately
         # the previous pruning stage could potentially have made certain items dependant on others
         # in the same or later sphere (because the location had 2 ways to access but the item originally
@@ -1799,6 +2010,8 @@ class Spoiler:
             required_locations -= sphere
             if not sphere:
                 raise RuntimeError(f'Not all required items reachable. Unreachable locations: {required_locations}')
+        logging.debug('Calculated %i final spheres in %.2f seconds.', len(collection_spheres),
+                      time.perf_counter() - phase_start)
 
         # we can finally output our playthrough
         self.playthrough = {"0": sorted([self.multiworld.get_name_string_for_object(item) for item in
@@ -1,6 +1,7 @@
 import collections
 import itertools
 import logging
+import time
 import typing
 from collections import Counter, deque
 
@@ -33,6 +34,60 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+def _update_pool_state(pool_state: CollectionState, collected: typing.Dict[int, Item],
+                       itempool: typing.Iterable[Item]) -> None:
+    """
+    Collects and removes items in pool_state, so that it has collected exactly the items of itempool on top of the state
+    it was created from, without collecting the whole itempool again.
+
+    :param pool_state: State to update in place, must not have been swept.
+    :param collected: The items pool_state has collected so far by id, gets updated to itempool.
+    :param itempool: The items pool_state should have collected.
+    """
+    current = {id(item): item for item in itempool}
+    for key in [key for key in collected if key not in current]:
+        pool_state.remove(collected.pop(key))
+    for key, item in current.items():
+        if key not in collected:
+            collected[key] = item
+            pool_state.collect(item, True)
+
+
+def find_fillable_location(locations: typing.Sequence[Location], state: CollectionState, item: Item,
+                           check_access: bool = True, player: typing.Optional[int] = None,
+                           known_reachability: typing.Optional[typing.Dict[Location, bool]] = None
+                           ) -> typing.Optional[int]:
+    """
+    Returns the index of the first location in `locations` that `item` can be filled into, or None if there is none.
+
+    :param locations: Locations to search through, in order.
+    :param state: State to check accessibility with.
+    :param item: Item to be filled.
+    :param check_access: Whether the location has to be reachable with state.
+    :param player: If set, only locations of this player are considered.
+    :param known_reachability: Cache of location accessibility with `state`, shared between calls so that each
+        location's access rule is only evaluated once for the same state. Has to be cleared when `state` changes.
+    """
+    if known_reachability is None:
+        known_reachability = {}
+    for i, location in enumerate(locations):
+        if player is not None and location.player != player:
+            continue
+        if not check_access or location.always_allow is not Location.always_allow \
+                or type(location).can_fill is not Location.can_fill:
+            if location.can_fill(state, item, check_access):
+                return i
+        # Without always_allow, a location can only be filled with an item it can take while ignoring access, and only
+        # if it is reachable, which does not depend on the item.
+        elif location.can_fill(state, item, False):
+            reachable = known_reachability.get(location)
+            if reachable is None:
+                reachable = known_reachability[location] = location.can_reach(state)
+            if reachable:
+                return i
+    return None
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -63,6 +118,12 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     total = min(len(item_pool), len(locations))
     placed = 0
 
+    # Unswept state holding the remaining items of players whose remove exactly undoes collect, only the items that left
+    # the pool since the previous round get removed. The remaining items of other players are collected each round.
+    reversible_players = {player for player, world in multiworld.worlds.items() if world.reversible_collection}
+    pool_state = base_state.copy()
+    pool_state_items: typing.Dict[int, Item] = {}
+
     while any(reachable_items.values()) and locations:
         if one_item_per_player:
             # grab one item per player
@@ -82,11 +143,17 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     del item_pool[-p]
                     break
 
+        reversible_pool: typing.List[Item] = []
+        remaining_pool: typing.List[Item] = []
+        for pool_item in itertools.chain(item_pool, unplaced_items):
+            (reversible_pool if pool_item.player in reversible_players else remaining_pool).append(pool_item)
+        _update_pool_state(pool_state, pool_state_items, reversible_pool)
         maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
+            pool_state, remaining_pool, multiworld.get_filled_locations(item.player)
             if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
+        known_reachability: typing.Dict[Location, bool] = {}
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
@@ -105,13 +172,12 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
+            i = find_fillable_location(locations, maximum_exploration_state, item_to_place, perform_access_check,
+                                       item_to_place.player if single_player_placement else None, known_reachability)
+            if i is not None:
+                # popping by index is faster than removing by content,
+                spot_to_fill = locations.pop(i)
+                # skipping a scan for the element
 
             else:
                 # we filled all reachable spots.
@@ -781,7 +847,9 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         if len(total_locations_count) == 0:
             return
 
+        balancing_start = time.perf_counter()
         while True:
+            sphere_start = time.perf_counter()
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
@@ -856,25 +924,37 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
+                        # Candidates are tested from the end, so the untested candidates are always a prefix of
+                        # items_to_test. Up to 8 unswept states that collected evenly spaced prefixes are kept, so
+                        # that each test only has to collect the candidates after the closest one.
+                        checkpoint_interval = max(1, (len(items_to_test) + 7) // 8)
+                        checkpoints = [state]
+                        for i in range(checkpoint_interval, len(items_to_test), checkpoint_interval):
+                            checkpoint = checkpoints[-1].copy()
+                            for location in items_to_test[i - checkpoint_interval:i]:
+                                checkpoint.collect(location.item, True, location)
+                            checkpoints.append(checkpoint)
+                        player_items_to_replace: typing.List[Location] = []
                         while items_to_test:
                             testing = items_to_test.pop()
-                            reducing_state = state.copy()
-                            for location in itertools.chain((
-                                    l for l in items_to_replace
-                                    if l.item.player == player
-                            ), items_to_test):
+                            checkpoint_index = len(items_to_test) // checkpoint_interval
+                            del checkpoints[checkpoint_index + 1:]
+                            reducing_state = checkpoints[checkpoint_index].copy()
+                            for location in itertools.chain(items_to_test[checkpoint_index * checkpoint_interval:],
+                                                            player_items_to_replace):
                                 reducing_state.collect(location.item, True, location)
 
                             reducing_state.sweep_for_advancements(locations=locations_to_test)
 
                             if multiworld.has_beaten_game(balancing_state):
                                 if not multiworld.has_beaten_game(reducing_state):
-                                    items_to_replace.append(testing)
+                                    player_items_to_replace.append(testing)
                             else:
                                 reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
                                 p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
                                 if p < threshold_percentages[player]:
-                                    items_to_replace.append(testing)
+                                    player_items_to_replace.append(testing)
+                        items_to_replace += player_items_to_replace
 
                     old_moved_item_count = moved_item_count
 
@@ -914,12 +994,15 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 if location.advancement:
                     state.collect(location.item, True, location)
             checked_locations |= sphere_locations
+            logging.debug(f"Sphere {sphere_num - 1} took {time.perf_counter() - sphere_start:.4f} seconds")
 
             if multiworld.has_beaten_game(state):
                 break
             elif not sphere_locations:
                 logging.warning("Progression Balancing ran out of paths.")
                 break
+        logging.debug(f"Progression balancing moved {moved_item_count} items over {sphere_num - 1} spheres "
+                      f"in {time.perf_counter() - balancing_start:.2f} seconds.")
 
 
 def swap_location_item(location_1: Location, location_2: Location, check_locked: bool = True) -> None:
@@ -932,6 +1015,8 @@ def swap_location_item(location_1: Location, location_2: Location, check_locked:
     location_2.item, location_1.item = location_1.item, location_2.item
     location_1.item.location = location_1
     location_2.item.location = location_2
+    if location_1.parent_region and location_1.parent_region.multiworld:
+        location_1.parent_region.multiworld.clear_sphere_cache()
 
 
 def parse_planned_blocks(multiworld: MultiWorld) -> dict[int, list[PlandoItemBlock]]:
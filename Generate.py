@@ -51,6 +51,12 @@ def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
                         help="List of options that can be set manually. Can be combined, for example \"bosses, items\"")
     parser.add_argument("--skip_prog_balancing", action="store_true",
                         help="Skip progression balancing step during generation.")
+    parser.add_argument("--stage_threads", default=defaults.stage_threads, type=int,
+                        help="Number of threads used to run isolated world generation steps concurrently.")
+    parser.add_argument("--zip_compression_level", default=defaults.zip_compression_level, type=int,
+                        choices=range(10), help="Compression level of the output archive, 0 stores files as is.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a JSON profile of stage and world timings and logic call counts next to the output.")
     parser.add_argument("--skip_output", action="store_true",
                         help="Skips generation assertion and output stages and skips multidata and spoiler output. "
                              "Intended for debugging and testing purposes.")
@@ -35,8 +35,11 @@ from Utils import (env_cleared_lib_path, init_logging, is_frozen, is_linux, is_m
 if __name__ == "__main__":
     init_logging('Launcher')
 
+from worlds import load_all_worlds
 from worlds.LauncherComponents import Component, components, icon_paths, SuffixIdentifier, Type
 
+load_all_worlds()  # worlds add their components when imported
+
 
 def open_host_yaml():
     s = settings.get_settings()
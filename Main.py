@@ -7,7 +7,6 @@ import tempfile
 import time
 from typing import Any
 import zipfile
-import zlib
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
@@ -15,7 +14,8 @@ from Fill import FillError, balance_multiworld_progression, distribute_items_res
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
 from NetUtils import convert_to_base_types
 from Options import StartInventoryPool
-from Utils import __version__, output_path, restricted_dumps, version_tuple
+from Profiling import GenerationProfiler, profile_stage
+from Utils import __version__, output_path, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -24,6 +24,15 @@ __all__ = ["main"]
 
 
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
+    if getattr(args, "profile", False):
+        # counting logic calls stops when leaving the profiler, even if generation fails
+        with GenerationProfiler() as profiler:
+            return _generate(args, seed, baked_server_options, profiler)
+    return _generate(args, seed, baked_server_options)
+
+
+def _generate(args, seed=None, baked_server_options: dict[str, object] | None = None,
+              profiler: GenerationProfiler | None = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -44,6 +53,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.sprite_pool = args.sprite_pool.copy()
 
     multiworld.set_options(args)
+    multiworld.profiler = profiler
+    stage_threads: int = getattr(args, "stage_threads", 0)
+    if stage_threads > 1:
+        multiworld.stage_executor = concurrent.futures.ThreadPoolExecutor(stage_threads, "Stage")
     if args.csv_output:
         from Options import dump_player_options
         dump_player_options(multiworld)
@@ -51,23 +64,22 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
-    logger.info(f"Found {len(AutoWorld.AutoWorldRegister.world_types)} World Types:")
-    longest_name = max(len(text) for text in AutoWorld.AutoWorldRegister.world_types)
-
-    world_classes = AutoWorld.AutoWorldRegister.world_types.values()
+    world_infos = worlds.get_world_infos()
+    logger.info(f"Found {len(world_infos)} World Types:")
+    longest_name = max(len(text) for text in world_infos)
 
-    version_count = max(len(cls.world_version.as_simple_string()) for cls in world_classes)
-    item_count = len(str(max(len(cls.item_names) for cls in world_classes)))
-    location_count = len(str(max(len(cls.location_names) for cls in world_classes)))
+    version_count = max(len(info["world_version"]) for info in world_infos.values())
+    item_count = len(str(max(info["items"] for info in world_infos.values())))
+    location_count = len(str(max(info["locations"] for info in world_infos.values())))
 
-    for name, cls in AutoWorld.AutoWorldRegister.world_types.items():
-        if not cls.hidden and len(cls.item_names) > 0:
+    for name, info in world_infos.items():
+        if not info["hidden"] and info["items"] > 0:
             logger.info(f" {name:{longest_name}}: "
-                        f"v{cls.world_version.as_simple_string():{version_count}} | "
-                        f"Items: {len(cls.item_names):{item_count}} | "
-                        f"Locations: {len(cls.location_names):{location_count}}")
+                        f"v{info['world_version']:{version_count}} | "
+                        f"Items: {info['items']:{item_count}} | "
+                        f"Locations: {info['locations']:{location_count}}")
 
-    del item_count, location_count
+    del world_infos, item_count, location_count
 
     # This assertion method should not be necessary to run if we are not outputting any multidata.
     if not args.skip_output and not args.spoiler_only:
@@ -117,6 +129,11 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     logger.info('Calculating Access Rules.')
     AutoWorld.call_all(multiworld, "set_rules")
 
+    if multiworld.stage_executor:
+        # set_rules is the last step that can be isolated
+        multiworld.stage_executor.shutdown()
+        multiworld.stage_executor = None
+
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
         multiworld.worlds[player].options.priority_locations.value -= multiworld.worlds[player].options.exclude_locations.value
@@ -185,9 +202,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld._all_state = None
 
     logger.info("Running Item Plando.")
-    resolve_early_locations_for_planned(multiworld)
-    distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
-                                           for x in multiworld.plando_item_blocks[player]])
+    with profile_stage(multiworld, "item_plando"):
+        resolve_early_locations_for_planned(multiworld)
+        distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
+                                               for x in multiworld.plando_item_blocks[player]])
 
     logger.info('Running Pre Main Fill.')
 
@@ -195,15 +213,17 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+    with profile_stage(multiworld, "fill"):
+        if multiworld.algorithm == 'flood':
+            flood_items(multiworld)  # different algo, biased towards early game progress items
+        elif multiworld.algorithm == 'balanced':
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        with profile_stage(multiworld, "progression_balancing"):
+            balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -214,6 +234,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.random.passthrough = False
 
     if args.skip_output:
+        write_profile(multiworld, logger)
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
         return multiworld
 
@@ -223,24 +244,46 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if args.spoiler_only:
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with profile_stage(multiworld, "playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+        write_profile(multiworld, logger)
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
     output = tempfile.TemporaryDirectory()
-    with output as temp_dir:
+    zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
+    with output as temp_dir, OutputArchive(zipfilename, getattr(args, "zip_compression_level", 9)) as archive:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
+        def output_directory(name: str) -> str:
+            # every output task writes to a directory of its own, so it can be archived as soon as the task is done
+            directory = os.path.join(temp_dir, name)
+            os.mkdir(directory)
+            return directory
+
+        with profile_stage(multiworld, "output"), \
+                concurrent.futures.ThreadPoolExecutor(len(output_players) + 3) as pool:
+            # spheres are recorded once and reused by the accessibility check and the multidata
+            cache_spheres_task = pool.submit(multiworld.cache_spheres)
+
+            def check_accessibility() -> bool:
+                cache_spheres_task.result()
+                return multiworld.fulfills_accessibility()
+
+            check_accessibility_task = pool.submit(check_accessibility)
+
+            stage_directory = output_directory("stage")
+            output_file_futures = {
+                pool.submit(AutoWorld.call_stage, multiworld, "generate_output", stage_directory): stage_directory
+            }
             for player in output_players:
                 # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                player_directory = output_directory(str(player))
+                output_file_futures[pool.submit(AutoWorld.call_single, multiworld, "generate_output", player,
+                                                player_directory)] = player_directory
 
             # collect ER hint info
             er_hint_data: dict[int, dict[int, str]] = {}
@@ -321,6 +364,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
                 # get spheres -> filter address==None -> skip empty
                 spheres: list[dict[int, set[int]]] = []
+                cache_spheres_task.result()
                 for sphere in multiworld.get_sendable_spheres():
                     current_sphere: dict[int, set[int]] = collections.defaultdict(set)
                     for sphere_location in sphere:
@@ -353,13 +397,11 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
-
-                with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(serialized_multidata)
+                with open(os.path.join(multidata_directory, f'{outfilebase}.archipelago'), 'wb') as f:
+                    NetUtils.dump_multidata(multidata, f)
 
-            output_file_futures.append(pool.submit(write_multidata))
+            multidata_directory = output_directory("multidata")
+            output_file_futures[pool.submit(write_multidata)] = multidata_directory
             if not check_accessibility_task.result():
                 if not multiworld.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
@@ -371,20 +413,100 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 if i % 10 == 0 or i == len(output_file_futures):
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
+                archive.add_directory(output_file_futures[future])
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with profile_stage(multiworld, "playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            spoiler_path = os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase)
+            multiworld.spoiler.to_file(spoiler_path)
+            archive.add_file(spoiler_path)
 
-        zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+        with profile_stage(multiworld, "archive"):
+            archive.close()
 
+    write_profile(multiworld, logger)
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
+
+
+compressed_extensions = frozenset((".archipelago", ".zip", ".apworld", ".7z", ".gz", ".bz2", ".xz", ".png", ".jpg"))
+"""Extensions of output files that are compressed already and stored in the output archive as they are."""
+
+
+class OutputArchive:
+    """
+    The final archive of the output files.
+    Files are written to it on a thread of its own as soon as they are added, while the remaining output is generated.
+    Members are deflated one at a time on that thread, as zipfile can only write one member at a time and has no public
+    way to add data that was deflated elsewhere. Files that are compressed already are stored without deflating them.
+    """
+
+    def __init__(self, path: str, compression_level: int = 9) -> None:
+        self.path = path
+        self.compression_level = compression_level
+        self.zipfile = zipfile.ZipFile(path, mode="w")
+        self.executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="Archive")
+        self.members: list[concurrent.futures.Future[None]] = []
+        self.names: set[str] = set()
+        self.closed = False
+
+    def __enter__(self) -> "OutputArchive":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type and not self.closed:
+            # don't leave an incomplete archive behind
+            self.closed = True
+            self.executor.shutdown(cancel_futures=True)
+            self.zipfile.close()
+            os.remove(self.path)
+        else:
+            self.close()
+
+    def add_file(self, path: str) -> None:
+        name = os.path.basename(path)
+        if name in self.names:
+            raise FileExistsError(f"Output file {name} was written by more than one output task.")
+        self.names.add(name)
+        self.members.append(self.executor.submit(self.write_member, path, name))
+
+    def add_directory(self, directory: str) -> None:
+        """Add the files of a directory, which must not be written to anymore."""
+        for file in sorted(os.scandir(directory), key=lambda entry: entry.name):
+            if file.is_file():
+                self.add_file(file.path)
+
+    def write_member(self, path: str, name: str) -> None:
+        """Write a file to the archive, deflated unless it is compressed already."""
+        compress_type = zipfile.ZIP_STORED
+        if self.compression_level and os.path.splitext(path)[1].lower() not in compressed_extensions:
+            with open(path, "rb") as f:
+                if f.read(4) != b"PK\x03\x04":  # zip based containers, such as patches
+                    compress_type = zipfile.ZIP_DEFLATED
+        self.zipfile.write(path, name, compress_type, self.compression_level)
+
+    def close(self) -> None:
+        """Wait for the added files to be written and finish the archive."""
+        if self.closed:
+            return
+        self.closed = True
+        self.executor.shutdown()
+        try:
+            for member in self.members:
+                member.result()
+        finally:
+            self.zipfile.close()
+
+
+def write_profile(multiworld: MultiWorld, logger: logging.Logger) -> None:
+    """Stop profiling and write the profile of the generation next to its output, if it was profiled."""
+    if multiworld.profiler:
+        multiworld.profiler.stop_counting()
+        profile_path = output_path(f"AP_{multiworld.seed_name}_profile.json")
+        multiworld.profiler.write(profile_path, multiworld)
+        logger.info(f"Wrote generation profile to {profile_path}")
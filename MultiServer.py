@@ -12,6 +12,7 @@ import inspect
 import itertools
 import logging
 import math
+import mmap
 import operator
 import pickle
 import random
@@ -210,6 +211,79 @@ class Client(Endpoint):
         return "Deallocated"
 
 
+class DataStorage:
+    """
+    Values written by clients with Set packages, with a version counter for every key, the keys changed since the last
+    save, and the clients subscribed to changes with SetNotify, either to exact keys or to every key with a prefix.
+    """
+    data: typing.Dict[str, typing.Any]
+    versions: typing.Dict[str, int]
+    """ number of times each key was set since the server started, to tell how often a key changes """
+    dirty: typing.Set[str]
+    """ keys set since the last save """
+    subscribers: typing.Dict[str, weakref.WeakSet[Client]]
+    prefix_subscribers: typing.Dict[str, weakref.WeakSet[Client]]
+    prefix_lengths: collections.Counter[int]
+    """ lengths of the subscribed prefixes, so a key is only looked up for prefixes that someone subscribed to """
+
+    def __init__(self) -> None:
+        self.data = {}
+        self.versions = collections.defaultdict(int)
+        self.dirty = set()
+        self.subscribers = collections.defaultdict(weakref.WeakSet)
+        self.prefix_subscribers = {}
+        self.prefix_lengths = collections.Counter()
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        return self.data.get(key, default)
+
+    def set(self, key: str, value: typing.Any) -> int:
+        """Store the value of a key and return its new version."""
+        self.data[key] = value
+        self.dirty.add(key)
+        self.versions[key] += 1
+        return self.versions[key]
+
+    def load(self, data: typing.Dict[str, typing.Any]) -> None:
+        """Replace all values with saved ones."""
+        self.data = data
+        self.dirty.clear()
+
+    def take_dirty(self) -> typing.Set[str]:
+        """Returns the keys set since the last call and starts tracking anew."""
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def subscribe(self, client: Client, key: str, prefix: bool = False) -> None:
+        """Notify client of changes to key, or to every key starting with key if prefix is set."""
+        if prefix:
+            clients = self.prefix_subscribers.get(key)
+            if clients is None:
+                clients = self.prefix_subscribers[key] = weakref.WeakSet()
+                self.prefix_lengths[len(key)] += 1
+            clients.add(client)
+        else:
+            self.subscribers[key].add(client)
+
+    def get_subscribers(self, key: str) -> typing.Set[Client]:
+        """Returns the clients to notify of a change to key."""
+        targets: typing.Set[Client] = set(self.subscribers.get(key, ()))
+        for length in tuple(self.prefix_lengths):
+            prefix = key[:length]
+            if length > len(key) or prefix not in self.prefix_subscribers:
+                continue
+            clients = self.prefix_subscribers[prefix]
+            if clients:
+                targets.update(clients)
+            else:  # all subscribers disconnected
+                del self.prefix_subscribers[prefix]
+                self.prefix_lengths[length] -= 1
+                if not self.prefix_lengths[length]:
+                    del self.prefix_lengths[length]
+        return targets
+
+
 team_slot = typing.Tuple[int, int]
 
 
@@ -235,9 +309,8 @@ class Context:
     hints_used: typing.Dict[typing.Tuple[int, int], int]
     groups: typing.Dict[int, typing.Set[int]]
     save_version = 2
-    stored_data: typing.Dict[str, object]
+    data_storage: DataStorage
     read_data: typing.Dict[str, object]
-    stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
@@ -248,6 +321,13 @@ class Context:
     all_item_and_group_names: typing.Dict[str, typing.Set[str]]
     all_location_and_group_names: typing.Dict[str, typing.Set[str]]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
+    encoded_game_packages: typing.ClassVar[collections.OrderedDict[typing.Tuple[str, str], str]] = \
+        collections.OrderedDict()
+    """ (game, checksum) -> game package encoded as JSON, shared by every Context in the process, least recently used
+    first """
+    encoded_game_packages_limit: typing.ClassVar[int] = 256
+    """ maximum number of game packages kept in encoded_game_packages """
+    encoded_game_packages_lock: typing.ClassVar[threading.Lock] = threading.Lock()
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
     logger: logging.Logger
@@ -262,9 +342,16 @@ class Context:
         self.log_network = log_network
         self.endpoints = []
         self.clients = {}
+        # team -> tag/game -> authenticated clients, to route Bounce packages
+        self.tag_clients: typing.Dict[int, typing.Dict[str, typing.Set[Client]]] = \
+            collections.defaultdict(lambda: collections.defaultdict(set))
+        self.game_clients: typing.Dict[int, typing.Dict[str, typing.Set[Client]]] = \
+            collections.defaultdict(lambda: collections.defaultdict(set))
         self.compatibility: int = compatibility
         self.shutdown_task = None
         self.data_filename = None
+        # multidata sections still to be loaded on demand, which keep the multidata open until they are closed
+        self.multidata_sections: typing.Optional[NetUtils.MultiDataSections] = None
         self.save_filename = None
         self.saving = False
         self.player_names: typing.Dict[team_slot, str] = {}
@@ -285,6 +372,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        # (team, finding_player, location) -> hint, for the hints stored in self.hints
+        self.location_hints: typing.Dict[typing.Tuple[int, int, int], Hint] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -304,15 +393,28 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
-        self.tags = ['AP']
+        self.save_lock = threading.Lock()
+        self.journal_filename: typing.Optional[str] = None
+        self.journal_generation = 0
+        self.journal_size = 0
+        self.snapshot_size = 0
+        self.compact_save = True
+        # changes since the last save, written to the save journal
+        self.changed_location_checks: typing.Set[team_slot] = set()
+        self.changed_hints: typing.Set[team_slot] = set()
+        self.journaled_item_counts: typing.Dict[typing.Tuple[int, int, bool], int] = {}
+        self.journaled_random_state: typing.Optional[tuple] = None
+        # slots that received items not yet delivered to their clients
+        self.dirty_slots: typing.Set[team_slot] = set()
+        self.item_delivery_scheduled = False
+        self.tags = ['AP', 'SetNotifyPrefix']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
         self.seed_name = ""
         self.groups = {}
         self.group_collected: typing.Dict[int, typing.Set[int]] = {}
         self.random = random.Random()
-        self.stored_data = {}
-        self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.data_storage = DataStorage()
         self.read_data = {}
         self.spheres = []
 
@@ -368,6 +470,30 @@ class Context:
             self.item_names[game].update(archipelago_item_names)
             self.location_names[game].update(archipelago_location_names)
 
+    def get_encoded_game_package(self, game: str) -> str:
+        """Get the JSON of a game's data package, encoding it only once per checksum."""
+        game_package = self.gamespackage[game]
+        checksum = game_package.get("checksum")
+        if checksum is None:
+            return self.dumper(game_package)
+        key = game, checksum
+        with self.encoded_game_packages_lock:
+            encoded = self.encoded_game_packages.get(key)
+            if encoded is not None:
+                self.encoded_game_packages.move_to_end(key)
+                return encoded
+        encoded = self.dumper(game_package)
+        with self.encoded_game_packages_lock:
+            self.encoded_game_packages[key] = encoded
+            while len(self.encoded_game_packages) > self.encoded_game_packages_limit:
+                self.encoded_game_packages.popitem(last=False)
+        return encoded
+
+    def get_data_package_msg(self, games: typing.Iterable[str]) -> str:
+        """Get an encoded DataPackage message for games, spliced together from the cached game packages."""
+        fragments = ",".join(f"{self.dumper(game)}:{self.get_encoded_game_package(game)}" for game in games)
+        return f'[{{"cmd":"DataPackage","data":{{"games":{{{fragments}}}}}}}]'
+
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
 
@@ -447,9 +573,47 @@ class Context:
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
+    def route_client(self, client: Client):
+        """Add an authenticated client to the Bounce routing indexes of its team."""
+        for tag in set(client.tags):
+            self.tag_clients[client.team][tag].add(client)
+        self.game_clients[client.team][self.games[client.slot]].add(client)
+
+    def unroute_client(self, client: Client):
+        """Remove a client from the Bounce routing indexes, before its team, slot or tags change."""
+        if client.team is None:
+            return
+        tag_clients = self.tag_clients[client.team]
+        for tag in set(client.tags):
+            if tag in tag_clients:
+                tag_clients[tag].discard(client)
+                if not tag_clients[tag]:
+                    del tag_clients[tag]
+        game_clients = self.game_clients[client.team]
+        game = self.games.get(client.slot)
+        if game in game_clients:
+            game_clients[game].discard(client)
+            if not game_clients[game]:
+                del game_clients[game]
+
+    def get_bounce_targets(self, team: int, games: typing.AbstractSet[str], tags: typing.AbstractSet[str],
+                           slots: typing.AbstractSet[int]) -> typing.Set[Client]:
+        targets: typing.Set[Client] = set()
+        tag_clients = self.tag_clients[team]
+        for tag in tags:
+            targets.update(tag_clients.get(tag, ()))
+        game_clients = self.game_clients[team]
+        for game in games:
+            targets.update(game_clients.get(game, ()))
+        slot_clients = self.clients.get(team, {})
+        for slot in slots:
+            targets.update(slot_clients.get(slot, ()))
+        return targets
+
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
+        self.unroute_client(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
             self.clients[endpoint.team][endpoint.slot].remove(endpoint)
         await on_client_disconnected(self, endpoint)
@@ -480,21 +644,41 @@ class Context:
                     raise Exception("No .archipelago found in archive.")
         else:
             with open(multidatapath, 'rb') as f:
-                data = f.read()
+                if f.read(1) == bytes([NetUtils.multidata_format_version]):
+                    # sections are loaded on demand from the mapped file
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    f.seek(0)
+                    data = f.read()
 
         self._load(self.decompress(data), {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
+    def close_multidata(self) -> None:
+        """Close the multidata file sections are loaded from, such as when the room is shut down."""
+        if self.multidata_sections is not None:
+            self.multidata_sections.close()
+            self.multidata_sections = None
+
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: bytes) -> MultiData:
+        if not len(data):
+            raise ValueError("Multidata is empty.")
         format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
+        if format_version > NetUtils.multidata_format_version:
+            raise Utils.VersionException(f"Incompatible multidata. It uses format version {format_version}, but this "
+                                         f"server only supports up to version {NetUtils.multidata_format_version}. "
+                                         f"Update the server to host this seed.")
+        if format_version == NetUtils.multidata_format_version:
+            return NetUtils.MultiDataSections(data)
         return restricted_loads(zlib.decompress(data[1:]))
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
 
+        self.close_multidata()
+        if isinstance(decoded_obj, NetUtils.MultiDataSections):
+            self.multidata_sections = decoded_obj
         self.read_data = {}
         # there might be a better place to put this.
         race_mode = decoded_obj.get("race_mode", 0)
@@ -537,8 +721,8 @@ class Context:
         self.connect_names = decoded_obj['connect_names']
         self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -548,6 +732,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self.index_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -593,17 +778,111 @@ class Context:
         return False
 
     def _save(self, exit_save: bool = False) -> bool:
+        """Appends the changes since the last save to the save journal,
+        or writes a full snapshot and starts a new journal if the journal grew larger than the snapshot."""
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            with self.save_lock:
+                if exit_save or self.compact_save or self.journal_size > self.snapshot_size:
+                    self._write_snapshot()
+                else:
+                    self._append_journal()
         except Exception as e:
+            # changes may have been taken out of the change tracking already, so only a snapshot is complete now
+            self.compact_save = True
             self.logger.exception(e)
             return False
         else:
             return True
 
+    def _take_changes(self) -> typing.Tuple[typing.Set[team_slot], typing.Set[team_slot], typing.Set[str],
+                                            typing.Dict[typing.Tuple[int, int, bool], int]]:
+        """Returns the changes since the last save and starts tracking anew.
+        Changes made while the returned ones are written are then also written by the next save."""
+        changes = (self.changed_location_checks, self.changed_hints, self.data_storage.take_dirty(),
+                   self.journaled_item_counts)
+        self.changed_location_checks = set()
+        self.changed_hints = set()
+        self.journaled_item_counts = {key: len(items) for key, items in self.received_items.items()}
+        return changes
+
+    def _write_snapshot(self) -> None:
+        import os
+        self.compact_save = True
+        self._take_changes()
+        self.journal_generation += 1
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        save = self.get_save()
+        encoded_save = zlib.compress(pickle.dumps(save))
+        temp_filename = self.save_filename + ".tmp"
+        with open(temp_filename, "wb") as f:
+            f.write(encoded_save)
+        os.replace(temp_filename, self.save_filename)
+        if self.journal_filename:
+            # a journal of an older generation is ignored on load, so a crash before this point loses nothing
+            with open(self.journal_filename, "wb") as f:
+                f.write(self.journal_generation.to_bytes(8, "little"))
+        self.snapshot_size = len(encoded_save)
+        self.journal_size = 0
+        self.journaled_random_state = save["random_state"]
+        self.compact_save = False
+
+    def _append_journal(self) -> None:
+        changed_location_checks, changed_hints, changed_stored_data, item_counts = self._take_changes()
+        received_items = {key: (item_counts.get(key, 0), self.received_items[key][item_counts.get(key, 0):count])
+                          for key, count in self.journaled_item_counts.items() if count != item_counts.get(key, 0)}
+        record = {
+            "received_items": received_items,
+            "location_checks": {key: set(self.location_checks[key]) for key in changed_location_checks},
+            "hints": {key: set(self.hints[key]) for key in changed_hints},
+            "stored_data": {key: self.data_storage.data[key] for key in changed_stored_data
+                            if key in self.data_storage.data},
+            **self.get_save_state()
+        }
+        # the random state is comparatively large and only changes when hints are bought
+        if record["random_state"] == self.journaled_random_state:
+            del record["random_state"]
+        else:
+            self.journaled_random_state = record["random_state"]
+        encoded_record = zlib.compress(pickle.dumps(record))
+        with open(self.journal_filename, "ab") as f:
+            f.write(len(encoded_record).to_bytes(4, "little"))
+            f.write(encoded_record)
+        self.journal_size += len(encoded_record) + 4
+
+    def _replay_journal(self) -> None:
+        """Applies the changes saved to the journal after the loaded snapshot."""
+        try:
+            with open(self.journal_filename, "rb") as f:
+                journal = f.read()
+        except FileNotFoundError:
+            return
+        if len(journal) < 8 or int.from_bytes(journal[:8], "little") != self.journal_generation:
+            return  # journal of an older snapshot, its changes are contained in the loaded snapshot
+        position = 8
+        records = 0
+        while position + 4 <= len(journal):
+            size = int.from_bytes(journal[position:position + 4], "little")
+            position += 4
+            if position + size > len(journal):
+                self.logger.warning("Save journal ends in an incomplete record, it was likely interrupted.")
+                break
+            self._apply_journal_record(restricted_loads(zlib.decompress(journal[position:position + size])))
+            position += size
+            records += 1
+        self.logger.info(f"Replayed {records} save journal records.")
+
+    def _apply_journal_record(self, record: dict) -> None:
+        for key, (start, items) in record["received_items"].items():
+            received_items = self.received_items.setdefault(key, [])
+            del received_items[start:]
+            received_items.extend(items)
+        self.location_checks.update(record["location_checks"])
+        self.hints.update(record["hints"])
+        self.index_hints()
+        self.data_storage.data.update(record["stored_data"])
+        self.name_aliases.clear()
+        self.set_save_state(record)
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
@@ -612,10 +891,12 @@ class Context:
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            self.journal_filename = self.save_filename + ".journal"
             try:
                 with open(self.save_filename, 'rb') as f:
                     save_data = restricted_loads(zlib.decompress(f.read()))
                     self.set_save(save_data)
+                self._replay_journal()
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -659,10 +940,20 @@ class Context:
             "version": self.save_version,
             "connect_names": self.connect_names,
             "received_items": self.received_items,
-            "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
             "location_checks": dict(self.location_checks),
-            "name_aliases": self.name_aliases,
+            "stored_data": self.data_storage.data,
+            "journal_generation": self.journal_generation,
+            **self.get_save_state()
+        }
+
+        return d
+
+    def get_save_state(self) -> dict:
+        """The parts of the save that are small enough to be saved in full with every journal record."""
+        return {
+            "hints_used": dict(self.hints_used),
+            "name_aliases": dict(self.name_aliases),
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
                 (key, value.timestamp()) for key, value in self.client_activity_timers.items()),
@@ -670,27 +961,35 @@ class Context:
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
                              "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
                              "countdown_mode": self.countdown_mode,
                              "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
         }
 
-        return d
-
     def set_save(self, savedata: dict):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
         if savedata["version"] > self.save_version:
             raise Exception("This savegame is newer than the server.")
         self.received_items = savedata["received_items"]
-        self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        self.index_hints()
+        self.location_checks.update(savedata["location_checks"])
+        self.journal_generation = savedata.get("journal_generation", 0)
+        self.set_save_state(savedata)
 
+        if "stored_data" in savedata:
+            self.data_storage.load(savedata["stored_data"])
+        # count items and slots from lists for items_handling = remote
+        self.logger.info(
+            f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
+            f'for {sum(k[2] for k in self.received_items)} players')
+
+    def set_save_state(self, savedata: dict):
+        self.hints_used.update(savedata["hints_used"])
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
         self.client_connection_timers.update(
@@ -699,8 +998,8 @@ class Context:
         self.client_activity_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
-        self.location_checks.update(savedata["location_checks"])
-        self.random.setstate(savedata["random_state"])
+        if "random_state" in savedata:
+            self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
             self.hint_cost = savedata["game_options"]["hint_cost"]
@@ -717,13 +1016,6 @@ class Context:
         if "group_collected" in savedata:
             self.group_collected = savedata["group_collected"]
 
-        if "stored_data" in savedata:
-            self.stored_data = savedata["stored_data"]
-        # count items and slots from lists for items_handling = remote
-        self.logger.info(
-            f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
-            f'for {sum(k[2] for k in self.received_items)} players')
-
     # rest
 
     def get_hint_cost(self, slot):
@@ -748,6 +1040,8 @@ class Context:
                 new_hints.add(new_hint)
                 if hint == new_hint:
                     continue
+                self.changed_hints.add((hint_team, hint_slot))
+                self.location_hints[hint_team, new_hint.finding_player, new_hint.location] = new_hint
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
                         changed.add((hint_team,player))
@@ -755,6 +1049,28 @@ class Context:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
 
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes the hints for the specified locations of the slot, usually after they were checked.
+        If a set is passed for 'changed', each (team,slot) pair that has at least one hint modified will be added to the
+        set."""
+        for location in locations:
+            hint = self.location_hints.get((team, slot, location))
+            if hint is None:
+                continue
+            new_hint = hint.re_check(self, team)
+            if hint == new_hint:
+                continue
+            for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                if changed is not None:
+                    changed.add((team, player))
+                self.replace_hint(team, player, hint, new_hint)
+
+    def index_hints(self) -> None:
+        """Rebuilds the index of hints by location after self.hints was replaced."""
+        self.location_hints = {(team, hint.finding_player, hint.location): hint
+                               for (team, slot), hints in self.hints.items() for hint in hints}
+
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
         return self.hints[team, slot]
@@ -825,9 +1141,12 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.location_hints[team, hint.finding_player, hint.location] = hint
+                    self.changed_hints.add((team, hint.finding_player))
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
+                        self.changed_hints.add((team, player))
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -843,15 +1162,14 @@ class Context:
                     async_start(self.send_msgs(client, client_hints))
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        return self.location_hints.get((team, finding_player, seeked_location))
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.location_hints[team, new_hint.finding_player, new_hint.location] = new_hint
+            self.changed_hints.add((team, slot))
     
     # "events"
 
@@ -874,13 +1192,13 @@ class Context:
 
     def on_changed_hints(self, team: int, slot: int):
         key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.data_storage.get_subscribers(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
 
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.data_storage.get_subscribers(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
 
@@ -1068,20 +1386,38 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """
+    Schedule delivery of new items to the clients of ctx.dirty_slots.
+    Items sent within one event loop iteration reach each client as a single ReceivedItems message.
+    """
+    if ctx.item_delivery_scheduled or not ctx.dirty_slots:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:  # no event loop to defer to
+        deliver_new_items(ctx)
+    else:
+        ctx.item_delivery_scheduled = True
+        loop.call_soon(deliver_new_items, ctx)
+
+
+def deliver_new_items(ctx: Context):
+    ctx.item_delivery_scheduled = False
+    dirty_slots = ctx.dirty_slots
+    ctx.dirty_slots = set()
+    for team, slot in sorted(dirty_slots):
+        for client in ctx.clients[team].get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1095,7 +1431,7 @@ def release_player(ctx: Context, team: int, slot: int):
     ctx.broadcast_text_all("%s (Team #%d) has released all remaining items from their world."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Release", "team": team, "slot": slot})
-    register_location_checks(ctx, team, slot, all_locations)
+    register_bulk_location_checks(ctx, team, {slot: all_locations})
     update_checked_locations(ctx, team, slot)
 
 
@@ -1106,8 +1442,8 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
     ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Collect", "team": team, "slot": slot})
-    for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
+    register_bulk_location_checks(ctx, team, all_locations, count_activity=False)
+    for source_player in all_locations:
         update_checked_locations(ctx, team, source_player)
 
     if not is_group:
@@ -1129,54 +1465,77 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.dirty_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
                              count_activity: bool = True):
-    slot_locations = ctx.locations[slot]
-    new_locations = set(locations) - ctx.location_checks[team, slot]
-    new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
-    if new_locations:
-        if count_activity:
-            ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
+    register_bulk_location_checks(ctx, team, {slot: locations}, count_activity, log_items=True)
 
-        sortable: list[tuple[int, int, int, int]] = []
+
+def register_bulk_location_checks(ctx: Context, team: int, checks: typing.Mapping[int, typing.Iterable[int]],
+                                  count_activity: bool = True, log_items: bool = False):
+    """
+    Register the checked locations of any number of slots of a team in one pass.
+    Item send messages are batched across all slots, and hints are rechecked and the game saved once.
+    Unless log_items is set, a single summary line is logged instead of one line per sent item.
+    """
+    new_checks: dict[int, set[int]] = {}
+    sortable: list[tuple[int, int, int, int, int]] = []
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for slot, locations in checks.items():
+        slot_locations = ctx.locations[slot]
+        new_locations = set(locations) - ctx.location_checks[team, slot]
+        new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
+        if not new_locations:
+            continue
+        new_checks[slot] = new_locations
+        if count_activity:
+            ctx.client_activity_timers[team, slot] = now
         for location in new_locations:
             # extract all fields to avoid runtime overhead in LocationStore
             item_id, target_player, flags = slot_locations[location]
-            # sort/group by receiver and item
-            sortable.append((target_player, item_id, location, flags))
+            # sort/group by sender, receiver and item
+            sortable.append((slot, target_player, item_id, location, flags))
+    if not new_checks:
+        return
 
-        info_texts: list[dict[str, typing.Any]] = []
-        for target_player, item_id, location, flags in sorted(sortable):
-            new_item = NetworkItem(item_id, location, slot, flags)
-            send_items_to(ctx, team, target_player, new_item)
+    info_texts: list[dict[str, typing.Any]] = []
+    for slot, target_player, item_id, location, flags in sorted(sortable):
+        new_item = NetworkItem(item_id, location, slot, flags)
+        send_items_to(ctx, team, target_player, new_item)
 
+        if log_items:
             ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
                 team + 1, ctx.player_names[(team, slot)], ctx.item_names[ctx.slot_info[target_player].game][item_id],
                 ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
-            if len(info_texts) >= 140:
-                # split into chunks that are close to compression window of 64K but not too big on the wire
-                # (roughly 1300-2600 bytes after compression depending on repetitiveness)
-                ctx.broadcast_team(team, info_texts)
-                info_texts.clear()
-            info_texts.append(json_format_send_event(new_item, target_player))
-        ctx.broadcast_team(team, info_texts)
-        del info_texts
-        del sortable
-
+        if len(info_texts) >= 140:
+            # split into chunks that are close to compression window of 64K but not too big on the wire
+            # (roughly 1300-2600 bytes after compression depending on repetitiveness)
+            ctx.broadcast_team(team, info_texts)
+            info_texts.clear()
+        info_texts.append(json_format_send_event(new_item, target_player))
+    ctx.broadcast_team(team, info_texts)
+    if not log_items:
+        ctx.logger.info("(Team #%d) %d items were sent from %d worlds." % (team + 1, len(sortable), len(new_checks)))
+    del info_texts
+    del sortable
+
+    for slot, new_locations in new_checks.items():
         ctx.location_checks[team, slot] |= new_locations
-        send_new_items(ctx)
+        ctx.changed_location_checks.add((team, slot))
+    send_new_items(ctx)
+    updated_slots: typing.Set[tuple[int, int]] = set()
+    for slot, new_locations in new_checks.items():
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
             "hint_points": get_slot_points(ctx, team, slot),
             "checked_locations": new_locations,  # send back new checks only
         }])
-        updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
-        for hint_team, hint_slot in updated_slots:
-            ctx.on_changed_hints(hint_team, hint_slot)
-        ctx.save()
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
+    for hint_team, hint_slot in updated_slots:
+        ctx.on_changed_hints(hint_team, hint_slot)
+    ctx.save()
 
 
 def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, str],
@@ -1675,6 +2034,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.dirty_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1692,9 +2052,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.get_rechecked_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1903,6 +2261,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             await ctx.send_msgs(client, [{"cmd": "ConnectionRefused", "errors": list(errors)}])
         else:
             team, slot = ctx.connect_names[args['name']]
+            ctx.unroute_client(client)
             if client.auth and client.team is not None and client.slot in ctx.clients[client.team]:
                 ctx.clients[team][slot].remove(client)  # re-auth, remove old entry
                 if client.team != team or client.slot != slot:
@@ -1917,6 +2276,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.no_locations = bool(client.tags & _non_game_messages.keys())
             # set NoText for old PopTracker clients that predate the tag to save traffic
             client.no_text = "NoText" in client.tags or ("PopTracker" in client.tags and client.version < (0, 5, 1))
+            ctx.route_client(client)
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
@@ -1942,23 +2302,15 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested]
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = [name for name in ctx.gamespackage if name not in exclusions]
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = list(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.get_data_package_msg(games))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1986,7 +2338,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
 
             if "tags" in args:
                 old_tags = client.tags
+                ctx.unroute_client(client)
                 client.tags = args["tags"]
+                ctx.route_client(client)
                 if set(old_tags) != set(client.tags):
                     client.no_locations = bool(client.tags & _non_game_messages.keys())
                     client.no_text = "NoText" in client.tags or (
@@ -2151,13 +2505,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             tags = set(args.get("tags", []))
             slots = set(args.get("slots", []))
             args["cmd"] = "Bounced"
-            msg = ctx.dumper([args])
-
-            for bounceclient in ctx.endpoints:
-                if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
-                                                         set(bounceclient.tags) & tags or
-                                                         bounceclient.slot in slots):
-                    await ctx.send_encoded_msgs(bounceclient, msg)
+            targets = ctx.get_bounce_targets(client.team, games, tags, slots)
+            if targets:
+                await ctx.broadcast_send_encoded_msgs(targets, ctx.dumper([args]))
 
         elif cmd == "Get":
             if "keys" not in args or type(args["keys"]) != list:
@@ -2168,7 +2518,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             keys = args["keys"]
             args["keys"] = {
                 key: ctx.read_data.get(key[6:], lambda: None)() if key.startswith("_read_") else
-                     ctx.stored_data.get(key, None)
+                     ctx.data_storage.get(key)
                 for key in keys
             }
             await ctx.send_msgs(client, [args])
@@ -2180,27 +2530,30 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                                               "text": 'Set', "original_cmd": cmd}])
                 return
             args["cmd"] = "SetReply"
-            value = ctx.stored_data.get(args["key"], args.get("default", 0))
-            args["original_value"] = copy.copy(value)
+            targets = ctx.data_storage.get_subscribers(args["key"])
+            if args.get("want_reply", False):
+                targets.add(client)
+            value = ctx.data_storage.get(args["key"], args.get("default", 0))
+            if targets:
+                # operations may modify the value in place, the original is only kept if it's sent to someone
+                args["original_value"] = copy.copy(value)
             args["slot"] = client.slot
             for operation in args["operations"]:
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
-            if args.get("want_reply", False):
-                targets.add(client)
+            args["value"] = value
+            ctx.data_storage.set(args["key"], value)
             if targets:
                 ctx.broadcast(targets, [args])
             ctx.save()
 
         elif cmd == "SetNotify":
-            if "keys" not in args or type(args["keys"]) != list:
+            if "keys" not in args or type(args["keys"]) != list or type(args.get("prefix", False)) != bool:
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
             for key in args["keys"]:
-                ctx.stored_data_notification_clients[key].add(client)
+                ctx.data_storage.subscribe(client, key, args.get("prefix", False))
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2548,11 +2901,11 @@ class ServerCommandProcessor(CommonCommandProcessor):
         """Debug Tool: list writable datastorage keys and approximate the size of their values with pickle."""
         total: int = 0
         texts = []
-        for key, value in self.ctx.stored_data.items():
+        for key, value in self.ctx.data_storage.data.items():
             size = len(pickle.dumps(value))
             total += size
-            texts.append(f"Key: {key} | Size: {size}B")
-        texts.insert(0, f"Found {len(self.ctx.stored_data)} keys, "
+            texts.append(f"Key: {key} | Size: {size}B | Version: {self.ctx.data_storage.versions.get(key, 0)}")
+        texts.insert(0, f"Found {len(self.ctx.data_storage.data)} keys, "
                         f"approximately totaling {Utils.format_SI_prefix(total, power=1024)}B")
         self.output("\n".join(texts))
 
@@ -2764,6 +3117,7 @@ async def main(args: argparse.Namespace):
     console_task.cancel()
     if ctx.shutdown_task:
         await ctx.shutdown_task
+    ctx.close_multidata()
 
 
 client_message_processor = ClientMessageProcessor
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterator, Mapping, MutableMapping, Sequence
 import typing
 import enum
+import io
+import struct
+import threading
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, Version, restricted_dump, restricted_dumps, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -415,6 +419,12 @@ class Hint(typing.NamedTuple):
 
 
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    # reverse indexes, built on first use, as the store does not change after construction:
+    # receiver -> [(sender, location)] and (receiver, item) -> [(ordinal, sender, location, flags)],
+    # with ordinal being the position in iteration order
+    _receiver_index: typing.Optional[typing.Dict[int, typing.List[typing.Tuple[int, int]]]]
+    _item_index: typing.Optional[typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int, int]]]]
+
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
 
@@ -427,20 +437,55 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
-    def find_item(self, slots: typing.Set[int], seeked_item_id: int
-                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        self._receiver_index = None
+        self._item_index = None
+
+    def get_size(self) -> int:
+        from sys import getsizeof
+        size = getsizeof(self) + sum(getsizeof(locations) + sum(getsizeof(data) for data in locations.values())
+                                     for locations in self.values())
+        if self._receiver_index is not None:
+            size += getsizeof(self._receiver_index) + sum(getsizeof(entries) + sum(getsizeof(entry) for entry in entries)
+                                                          for entries in self._receiver_index.values())
+        if self._item_index is not None:
+            size += getsizeof(self._item_index) + sum(getsizeof(key) + getsizeof(entries) +
+                                                      sum(getsizeof(entry) for entry in entries)
+                                                      for key, entries in self._item_index.items())
+        return size
+
+    def _build_reverse_indexes(self) -> None:
+        import collections
+        receiver_index: typing.Dict[int, typing.List[typing.Tuple[int, int]]] = collections.defaultdict(list)
+        item_index: typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int, int]]] = \
+            collections.defaultdict(list)
+        ordinal = 0
         for finding_player, check_data in self.items():
             for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+                receiver_index[receiving_player].append((finding_player, location_id))
+                item_index[receiving_player, item_id].append((ordinal, finding_player, location_id, item_flags))
+                ordinal += 1
+        self._receiver_index = dict(receiver_index)
+        self._item_index = dict(item_index)
+
+    def find_item(self, slots: typing.Set[int], seeked_item_id: int
+                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        if self._item_index is None:
+            self._build_reverse_indexes()
+        found = [(ordinal, finding_player, location_id, seeked_item_id, receiving_player, item_flags)
+                 for receiving_player in slots
+                 for ordinal, finding_player, location_id, item_flags
+                 in self._item_index.get((receiving_player, seeked_item_id), ())]
+        if len(slots) > 1:
+            found.sort()  # restore iteration order across receivers
+        for _, finding_player, location_id, item_id, receiving_player, item_flags in found:
+            yield finding_player, location_id, item_id, receiving_player, item_flags
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
-        import collections
-        all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        if self._receiver_index is None:
+            self._build_reverse_indexes()
+        all_locations: typing.Dict[int, typing.Set[int]] = {}
+        for source_slot, location_id in self._receiver_index.get(slot, ()):
+            all_locations.setdefault(source_slot, set()).add(location_id)
         return all_locations
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
@@ -510,6 +555,208 @@ class MultiData(typing.TypedDict):
     race_mode: int
 
 
+multidata_format_version = 4
+"""
+Version of the .archipelago container written by Main, stored in its first byte.
+
+Servers reject files with a higher version, so bumping it means seeds generated afterwards can only be hosted by servers
+of at least the same Archipelago version. Version 4, the sectioned container, is not readable by servers from before it.
+"""
+multidata_sections = ("locations", "spheres", "precollected_hints", "datapackage")
+"""Multidata entries stored in sections of their own, besides one section per slot for slot_data."""
+_index_header = struct.Struct("<I")
+
+
+class _CompressedSection(io.RawIOBase):
+    """Binary file-like object compressing everything written to it, such as pickles written by restricted_dump."""
+
+    def __init__(self, compression_level: int) -> None:
+        super().__init__()
+        self.compressor = zlib.compressobj(compression_level)
+        self.chunks: list[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: typing.Any) -> int:
+        chunk = self.compressor.compress(data)
+        if chunk:
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            chunk = self.compressor.flush()
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+        super().close()
+
+
+def _compress_section(value: typing.Any, compression_level: int) -> _CompressedSection:
+    section = _CompressedSection(compression_level)
+    restricted_dump(value, section)
+    section.close()
+    return section
+
+
+def dump_multidata(multidata: Mapping[str, typing.Any], file: typing.BinaryIO, compression_level: int = 9) -> None:
+    """
+    Write multidata to file in the sectioned container format.
+
+    The container starts with the format version byte and the size of an index, followed by the compressed index that
+    maps the sections to their position. Every section is compressed on its own, so readers only need to decompress
+    the entries they access. Entries not listed in multidata_sections share one base section.
+    Sections are pickled straight into their compressor, so only their compressed form is kept until it is written.
+    """
+    base: dict[str, typing.Any] = {}
+    sections: list[tuple[str | tuple[str, int], _CompressedSection]] = []
+    for key, value in multidata.items():
+        if key == "slot_data":
+            for slot, slot_data in value.items():
+                sections.append((("slot_data", slot), _compress_section(slot_data, compression_level)))
+        elif key in multidata_sections:
+            sections.append((key, _compress_section(value, compression_level)))
+        else:
+            base[key] = value
+    sections.insert(0, ("base", _compress_section(base, compression_level)))
+
+    positions: dict[str | tuple[str, int], tuple[int, int]] = {}
+    offset = 0
+    for name, section in sections:
+        positions[name] = offset, section.size
+        offset += section.size
+    index = zlib.compress(restricted_dumps({"keys": list(multidata), "sections": positions}), compression_level)
+    file.write(bytes([multidata_format_version]))
+    file.write(_index_header.pack(len(index)))
+    file.write(index)
+    for _, section in sections:
+        file.writelines(section.chunks)
+
+
+def encode_multidata(multidata: Mapping[str, typing.Any], compression_level: int = 9) -> bytes:
+    """Encode multidata in the sectioned container format, see dump_multidata."""
+    buffer = io.BytesIO()
+    dump_multidata(multidata, buffer, compression_level)
+    return buffer.getvalue()
+
+
+class _SectionReader:
+    __slots__ = ("buffer", "data", "positions", "start", "lock")
+
+    def __init__(self, data: bytes | memoryview | typing.Any, positions: dict[str | tuple[str, int], tuple[int, int]],
+                 start: int) -> None:
+        self.buffer = data
+        self.data = memoryview(data)
+        self.positions = positions
+        self.start = start
+        # held while a section is loaded, so that it is only loaded once if multiple threads ask for it
+        self.lock = threading.Lock()
+
+    def read(self, name: str | tuple[str, int]) -> typing.Any:
+        offset, size = self.positions[name]
+        offset += self.start
+        return restricted_loads(zlib.decompress(self.data[offset:offset + size]))
+
+    def close(self) -> None:
+        with self.lock:
+            self.data.release()
+            if hasattr(self.buffer, "close"):
+                self.buffer.close()
+
+
+class SlotDataSections(Mapping[int, typing.Any]):
+    """slot_data of a sectioned multidata, decompressing the data of each slot on first access."""
+
+    def __init__(self, reader: _SectionReader) -> None:
+        self._reader = reader
+        self._slots = [name[1] for name in reader.positions if isinstance(name, tuple) and name[0] == "slot_data"]
+        self._loaded: dict[int, typing.Any] = {}
+
+    def __getitem__(self, slot: int) -> typing.Any:
+        try:
+            return self._loaded[slot]
+        except KeyError:
+            if ("slot_data", slot) not in self._reader.positions:
+                raise
+        with self._reader.lock:
+            if slot not in self._loaded:
+                self._loaded[slot] = self._reader.read(("slot_data", slot))
+        return self._loaded[slot]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class MultiDataSections(MutableMapping[str, typing.Any]):
+    """
+    Multidata read from the sectioned container format, decompressing each section on first access.
+
+    data can be any buffer, such as a memory mapped file, which has to stay open while sections are loaded. Sections
+    can be loaded from multiple threads.
+    """
+
+    def __init__(self, data: bytes | memoryview | typing.Any) -> None:
+        if not len(data) or data[0] != multidata_format_version:
+            raise ValueError(f"Not a version {multidata_format_version} multidata.")
+        index_start = 1 + _index_header.size
+        if len(data) < index_start:
+            raise ValueError("Multidata is truncated.")
+        index_size, = _index_header.unpack_from(data, 1)
+        if len(data) < index_start + index_size:
+            raise ValueError("Multidata is truncated.")
+        index = restricted_loads(zlib.decompress(memoryview(data)[index_start:index_start + index_size]))
+        sections_start = index_start + index_size
+        if any(sections_start + offset + size > len(data) for offset, size in index["sections"].values()):
+            raise ValueError("Multidata is truncated.")
+        self._reader = _SectionReader(data, index["sections"], sections_start)
+        self._keys: list[str] = index["keys"]
+        self._loaded: dict[str, typing.Any] = self._reader.read("base")
+
+    def __getitem__(self, key: str) -> typing.Any:
+        try:
+            return self._loaded[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+        with self._reader.lock:
+            if key not in self._loaded:
+                if key == "slot_data":
+                    self._loaded[key] = SlotDataSections(self._reader)
+                else:
+                    self._loaded[key] = self._reader.read(key)
+        return self._loaded[key]
+
+    def close(self) -> None:
+        """Release data and close it, if it is a file such as a memory mapped one. Sections that weren't loaded
+        can't be loaded anymore afterwards."""
+        self._reader.close()
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        if key not in self._keys:
+            self._keys.append(key)
+        self._loaded[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self._keys:
+            raise KeyError(key)
+        self._keys.remove(key)
+        self._loaded.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
     LocationStore = _LocationStore
 else:
@@ -0,0 +1,163 @@
+"""
+Structured profiling of a generation, enabled with Generate.py --profile.
+
+Records the wall time of every generation stage and of each world's part in it, and counts how often the logic hot paths
+are hit, so a regression can be traced to a world or phase without going through a full cProfile dump.
+"""
+import collections
+import contextlib
+import functools
+import itertools
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from types import TracebackType
+from typing import Any
+
+from BaseClasses import CollectionState, Entrance, Location, MultiWorld, Region
+
+counted_methods: dict[str, tuple[type, str]] = {
+    "state_copies": (CollectionState, "copy"),
+    "sweeps": (CollectionState, "sweep_for_advancements"),
+    "reachable_region_updates": (CollectionState, "update_reachable_regions"),
+    "can_reach": (CollectionState, "can_reach"),
+    "region_checks": (Region, "can_reach"),
+    "entrance_rules": (Entrance, "can_reach"),
+    "location_rules": (Location, "can_reach"),
+}
+"""Counter name to the class and name of the method that is counted for it, including overrides in subclasses."""
+
+_counting_lock = threading.Lock()
+"""Held while a profiler counts calls, as the counted methods are replaced on their classes."""
+
+
+def _get_counted_methods() -> dict[tuple[type, str], str]:
+    """
+    Returns the classes defining a counted method or an override of it, with the method name, mapped to the counter name.
+    Overrides calling the method they override through super() are left out, so that each call is counted once.
+    """
+    methods: dict[tuple[type, str], str] = {}
+    for counter, (cls, method_name) in counted_methods.items():
+        classes = [cls]
+        while classes:
+            current = classes.pop()
+            code = getattr(current.__dict__.get(method_name), "__code__", None)
+            if code is not None and (current is cls or "super" not in code.co_names):
+                methods[current, method_name] = counter
+            classes.extend(current.__subclasses__())
+    return methods
+
+
+def _counted(method: Callable[..., Any], calls: "itertools.count[int]") -> Callable[..., Any]:
+    @functools.wraps(method)
+    def counted(*args: Any, **kwargs: Any) -> Any:
+        next(calls)
+        return method(*args, **kwargs)
+    return counted
+
+
+class GenerationProfiler:
+    """
+    Collects stage timings and logic call counts of a single generation.
+
+    While the profiler is entered as a context manager, the counted methods are replaced by wrappers that count their
+    calls, from any thread. This only adds a function call to each counted call, so stage timings stay comparable to
+    those of a generation that is not profiled. Only one profiler can count calls at a time.
+    """
+    stage_times: dict[str, float]
+    """Total wall time of each stage of the generation, including Main phases such as fill."""
+    world_times: dict[int, dict[str, float]]
+    """Wall time of each world method, per player."""
+    class_times: dict[str, float]
+    """Wall time of each stage method called once per world class."""
+    counters: collections.Counter[str]
+
+    def __init__(self) -> None:
+        self.stage_times = {}
+        self.world_times = collections.defaultdict(dict)
+        self.class_times = {}
+        self.counters = collections.Counter()
+        self._originals: dict[tuple[type, str], tuple[str, Callable[..., Any], "itertools.count[int]"]] = {}
+        self._counting = False
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def __enter__(self) -> "GenerationProfiler":
+        if not _counting_lock.acquire(blocking=False):
+            logging.warning("Could not count logic calls of the generation, as another generation is counting them.")
+            return self
+        self._counting = True
+        for (cls, method_name), counter in _get_counted_methods().items():
+            method = cls.__dict__[method_name]
+            calls = itertools.count()
+            self._originals[cls, method_name] = counter, method, calls
+            setattr(cls, method_name, _counted(method, calls))
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None,
+                 traceback: TracebackType | None) -> None:
+        self.stop_counting()
+
+    def stop_counting(self) -> None:
+        """Stop counting calls of the logic hot paths and add them to the counters. Safe to call multiple times."""
+        if not self._counting:
+            return
+        self._counting = False
+        originals, self._originals = self._originals, {}
+        for (cls, method_name), (counter, method, calls) in originals.items():
+            setattr(cls, method_name, method)
+            self.counters[counter] += next(calls)
+        _counting_lock.release()
+
+    def add_time(self, name: str, taken: float, player: int | None = None) -> None:
+        """Add the time taken by a world method for a player, or by a class stage method if player is None."""
+        with self._lock:
+            if player is None:
+                self.class_times[name] = self.class_times.get(name, 0.0) + taken
+            else:
+                player_times = self.world_times[player]
+                player_times[name] = player_times.get(name, 0.0) + taken
+
+    def add_stage_time(self, name: str, taken: float) -> None:
+        """Add the time taken by a stage of the generation. Repeated stages accumulate."""
+        with self._lock:
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + taken
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage of the generation."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start)
+
+    def to_dict(self, multiworld: MultiWorld) -> dict[str, Any]:
+        return {
+            "seed": multiworld.seed_name,
+            "total": time.perf_counter() - self._start,
+            "stages": self.stage_times,
+            "worlds": {
+                player: {
+                    "name": multiworld.player_name[player],
+                    "game": multiworld.game[player],
+                    "times": self.world_times.get(player, {}),
+                    "total": sum(self.world_times.get(player, {}).values()),
+                } for player in multiworld.player_ids
+            },
+            "class_stages": self.class_times,
+            "counters": dict(self.counters),
+        }
+
+    def write(self, path: str, multiworld: MultiWorld) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(multiworld), f, indent=2)
+
+
+def profile_stage(multiworld: MultiWorld, name: str) -> contextlib.AbstractContextManager[None]:
+    """Time a stage of the generation if the multiworld is being profiled."""
+    if multiworld.profiler:
+        return multiworld.profiler.stage(name)
+    return contextlib.nullcontext()
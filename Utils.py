@@ -10,6 +10,8 @@ import itertools
 import subprocess
 import sys
 import pickle
+import copyreg
+import types
 import functools
 import io
 import collections
@@ -493,16 +495,68 @@ def restricted_loads(s: bytes) -> Any:
     return RestrictedUnpickler(io.BytesIO(s)).load()
 
 
+class RestrictedPickler(pickle.Pickler):
+    """
+    Pickler that refuses to write globals the unpickler would not load, so the result does not need to be loaded again
+    to be validated. Validates against RestrictedUnpickler unless another unpickler is given.
+    Objects that are reduced the default way are left to the C pickler, which passes the globals it writes for them
+    back through reducer_override, so only globals and custom reductions are checked here.
+    """
+
+    def __init__(self, file: BinaryIO, protocol: Optional[int] = None,
+                 unpickler: Optional[pickle.Unpickler] = None) -> None:
+        super(RestrictedPickler, self).__init__(file, protocol)
+        if protocol is None:
+            protocol = pickle.DEFAULT_PROTOCOL
+        self.protocol = pickle.HIGHEST_PROTOCOL if protocol < 0 else protocol
+        self.unpickler = unpickler if unpickler is not None else RestrictedUnpickler(io.BytesIO())
+        self.allowed_globals: typing.Set[int] = set()
+        self.default_reduce_types: typing.Set[type] = set()
+
+    def check_global(self, obj: Any, name: Optional[str] = None) -> None:
+        if id(obj) in self.allowed_globals:
+            return
+        if name is None:
+            name = getattr(obj, "__qualname__", None) or obj.__name__
+        module = pickle.whichmodule(obj, name)
+        try:
+            allowed = self.unpickler.find_class(module, name) is obj
+        except (pickle.UnpicklingError, AttributeError, ImportError, TypeError) as e:
+            raise pickle.PicklingError(f"global '{module}.{name}' is forbidden") from e
+        if not allowed:
+            raise pickle.PicklingError(f"global '{module}.{name}' is forbidden")
+        self.allowed_globals.add(id(obj))
+
+    def reducer_override(self, obj: Any) -> Any:
+        obj_type = type(obj)
+        if obj_type in self.default_reduce_types:
+            return NotImplemented
+        if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+            # pickled by name
+            self.check_global(obj)
+            return NotImplemented
+        reduce = copyreg.dispatch_table.get(obj_type)
+        if reduce is None and obj_type.__reduce_ex__ is object.__reduce_ex__ \
+                and obj_type.__reduce__ is object.__reduce__:
+            self.default_reduce_types.add(obj_type)
+            return NotImplemented
+        rv = reduce(obj) if reduce else obj.__reduce_ex__(self.protocol)
+        if isinstance(rv, str):
+            # object is pickled by name
+            self.check_global(obj, rv)
+        return rv
+
+
+def restricted_dump(obj: Any, file: BinaryIO) -> None:
+    """Helper function analogous to pickle.dump(). If pickling fails, part of the pickle may have been written."""
+    RestrictedPickler(file).dump(obj)
+
+
 def restricted_dumps(obj: Any) -> bytes:
     """Helper function analogous to pickle.dumps()."""
-    s = pickle.dumps(obj)
-    # Assert that the string can be successfully loaded by restricted_loads
-    try:
-        restricted_loads(s)
-    except pickle.UnpicklingError as e:
-        raise pickle.PicklingError(e) from e
-
-    return s
+    buffer = io.BytesIO()
+    restricted_dump(obj, buffer)
+    return buffer.getvalue()
 
 
 class ByValue:
@@ -110,14 +110,16 @@ if __name__ == "__main__":
         logging.exception(e)
         logging.warning("Could not update LttP sprites.")
     app = get_app()
-    from worlds import AutoWorldRegister, network_data_package
+    from worlds import AutoWorldRegister, network_data_package, load_all_worlds
+    load_all_worlds()
     # Update to only valid WebHost worlds
     invalid_worlds = {name for name, world in AutoWorldRegister.world_types.items()
                       if not hasattr(world.web, "tutorials")}
     if invalid_worlds:
         logging.error(f"Following worlds not loaded as they are invalid for WebHost: {invalid_worlds}")
-    AutoWorldRegister.world_types = {k: v for k, v in AutoWorldRegister.world_types.items() if k not in invalid_worlds}
-    network_data_package["games"] = {k: v for k, v in network_data_package["games"].items() if k not in invalid_worlds}
+    for name in invalid_worlds:
+        del AutoWorldRegister.world_types[name]
+        del network_data_package["games"][name]
     create_options_files()
     copy_tutorials_files_to_static()
     if app.config["SELFLAUNCH"]:
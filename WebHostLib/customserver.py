@@ -73,7 +73,7 @@ class WebHostContext(Context):
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
-        self.tags = ["AP", "WebHost"]
+        self.tags = ["AP", "WebHost", "SetNotifyPrefix"]
 
     def __del__(self):
         try:
@@ -363,6 +363,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     if ctx.server and hasattr(ctx.server, "ws_server"):
                         ctx.server.ws_server.close()
                         await ctx.server.ws_server.wait_closed()
+                    ctx.close_multidata()
 
                     with db_session:
                         # ensure the Room does not spin up again on its own, minute of safety buffer
@@ -1,7 +1,8 @@
 import datetime
 import collections
+import functools
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
@@ -12,10 +13,12 @@ from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict, utcnow
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, Seed
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# Number of decoded seeds, data packages and room saves kept for tracker requests, per process.
+TRACKER_DATA_CACHE_SIZE = 64
 
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
@@ -24,6 +27,42 @@ TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
 
 
+@functools.lru_cache(maxsize=TRACKER_DATA_CACHE_SIZE)
+def _get_multidata(seed_id: UUID) -> Mapping[str, Any]:
+    """Retrieves the decoded multidata of a seed, shared by all tracker requests. Must not be modified."""
+    return Context.decompress(Seed[seed_id].multidata)
+
+
+@functools.lru_cache(maxsize=TRACKER_DATA_CACHE_SIZE)
+def _get_multisave(room_id: UUID, last_activity: datetime.datetime) -> Dict[str, Any]:
+    """Retrieves the decoded save of a room, shared by all tracker requests. Must not be modified.
+    Every save of an active room updates its last activity, so a newer save is never hidden by a cached one.
+    """
+    multisave = Room[room_id].multisave
+    return restricted_loads(multisave) if multisave else {}
+
+
+class DataPackageTables(NamedTuple):
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+
+@functools.lru_cache(maxsize=TRACKER_DATA_CACHE_SIZE)
+def _get_data_package_tables(checksum: str) -> DataPackageTables:
+    """Retrieves the lookup tables of a game data package, shared by all tracker requests. Must not be modified."""
+    game_package = restricted_loads(GameDataPackage.get(checksum=checksum).data)
+    return DataPackageTables(
+        KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+            id: name for name, id in game_package["item_name_to_id"].items()}),
+        KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+            id: name for name, id in game_package["location_name_to_id"].items()}),
+        game_package["item_name_to_id"],
+        game_package["location_name_to_id"],
+    )
+
+
 def _cache_results(func: Callable) -> Callable:
     """Stores the results of any computationally expensive methods after the initial call in TrackerData.
     If called again, returns the cached result instead, as results will not change for the lifetime of TrackerData.
@@ -48,15 +87,15 @@ class TrackerData:
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
     """
     room: Room
-    _multidata: Dict[str, Any]
+    _multidata: Mapping[str, Any]
     _multisave: Dict[str, Any]
     _tracker_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multidata = _get_multidata(room.seed.id)
+        self._multisave = _get_multisave(room.id, room.last_activity)
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -70,15 +109,13 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            tables = _get_data_package_tables(game_package["checksum"])
+            self.item_id_to_name[game] = tables.item_id_to_name
+            self.location_id_to_name[game] = tables.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = tables.item_name_to_id
+            self.location_name_to_id[game] = tables.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -13,7 +13,7 @@ from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
-from NetUtils import GamesPackage, SlotType
+from NetUtils import GamesPackage, MultiDataSections, SlotType, encode_multidata
 from Utils import VersionException, __version__
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
@@ -90,7 +90,10 @@ def process_multidata(compressed_multidata, files={}):
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    if isinstance(decompressed_multidata, MultiDataSections):
+        compressed_multidata = encode_multidata(decompressed_multidata)
+    else:
+        compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
     return slots, compressed_multidata
 
 
@@ -184,8 +187,8 @@ def uploads():
                     with zipfile.ZipFile(uploaded_file, "r") as zfile:
                         try:
                             res = upload_zip_to_db(zfile)
-                        except VersionException:
-                            flash(f"Could not load multidata. Wrong Version detected.")
+                        except VersionException as e:
+                            flash(f"Could not load multidata. Wrong Version detected. ({e})")
                         except Exception as e:
                             flash(f"Could not load multidata. File may be corrupted or incompatible. ({e})")
                         else:
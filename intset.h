@@ -1,5 +1,9 @@
 /* A specialized unordered_set implementation for literals, where bucket_count
  * is defined at initialization rather than increased automatically.
+ *
+ * _speedups.LocationStore does not use it anymore, as it answers player queries
+ * from its reverse indexes. It is kept as a generic helper for C extensions and
+ * is covered by test/cpp/intset, the only test of the C++ test project.
  */
 #include <stddef.h>
 #include <stdbool.h>
@@ -32,6 +32,10 @@ class CachedRuleBuilderWorld(World):
     rule_caching_enabled: ClassVar[bool] = True
     """Flag to inform rules that the caching system for this world is enabled. It should not be overridden."""
 
+    reversible_collection: ClassVar[bool] = True
+    """collect and remove only add to and remove from the default collection and drop the cached rule results that
+    depend on the item, so removing still undoes collecting."""
+
     def __init__(self, multiworld: MultiWorld, player: int) -> None:
         super().__init__(multiworld, player)
         self.rule_item_dependencies = defaultdict(set)
@@ -24,7 +24,8 @@ __all__ = [
 
 no_gui = False
 skip_autosave = False
-_world_settings_name_cache: dict[str, str] = {}  # TODO: cache on disk and update when worlds change
+_world_settings_name_cache: dict[str, str] = {}
+_world_settings_game_cache: dict[str, str] = {}  # games of settings from worlds that are not imported yet
 _world_settings_name_cache_updated = False
 _lock = Lock()
 
@@ -37,7 +38,13 @@ def _update_cache() -> None:
 
     try:
         from worlds.AutoWorld import AutoWorldRegister
-        for world in AutoWorldRegister.world_types.values():
+        # use the world index for worlds that are not imported yet
+        for game, info in getattr(AutoWorldRegister.world_types, "infos", {}).items():
+            if info["settings"]:
+                settings_key, world_name = info["settings"]
+                _world_settings_name_cache[settings_key] = world_name
+                _world_settings_game_cache[settings_key] = game
+        for world in dict.values(AutoWorldRegister.world_types):
             annotation = world.__annotations__.get("settings", None)
             if annotation is None or annotation == "ClassVar[Optional['Group']]":
                 continue
@@ -687,6 +694,19 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class StageThreads(int):
+        """
+        Number of threads used to run the generation steps of worlds that support it concurrently.
+        0 or 1 runs every step on the generating thread. Only speeds up generation on free-threaded Python builds,
+        the generated seed is the same either way.
+        """
+
+    class ZipCompressionLevel(int):
+        """
+        Compression level of the generated output archive, from 1 (fastest) to 9 (smallest).
+        0 stores files uncompressed. Files that are compressed already are always stored as they are.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -696,6 +716,8 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    stage_threads: StageThreads = StageThreads(0)
+    zip_compression_level: ZipCompressionLevel = ZipCompressionLevel(9)
     loglevel: str = "info"
     logtime: bool = False
 
@@ -765,6 +787,9 @@ class Settings(Group):
                 # not a world group
                 return super().__getattribute__(key)
             # directly import world and grab settings class
+            if key in _world_settings_game_cache:
+                from worlds.AutoWorld import AutoWorldRegister
+                AutoWorldRegister.world_types.get(_world_settings_game_cache[key])  # registers apworld imports
             world_mod, world_cls_name = _world_settings_name_cache[key].rsplit(".", 1)
             try:
                 world = cast(type, getattr(__import__(world_mod, fromlist=[world_cls_name]), world_cls_name))
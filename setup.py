@@ -57,7 +57,11 @@ if __name__ == "__main__":
     import ModuleUpdate
     ModuleUpdate.update(yes="--yes" in sys.argv or "-y" in sys.argv)
 
+from worlds import load_all_worlds
 from worlds.LauncherComponents import components, icon_paths
+
+load_all_worlds()  # worlds add their components when imported
+
 from Utils import version_tuple, is_windows, is_linux
 from Cython.Build import cythonize
 
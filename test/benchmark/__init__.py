@@ -5,3 +5,9 @@ if __name__ == "__main__":
     load_worlds.run_load_worlds_benchmark()
     import locations
     locations.run_locations_benchmark()
+    import location_store
+    location_store.run_location_store_benchmark()
+    import data_storage
+    data_storage.run_data_storage_benchmark()
+    import oot_rules
+    oot_rules.run_oot_rules_benchmark()
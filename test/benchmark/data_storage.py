@@ -0,0 +1,58 @@
+def run_data_storage_benchmark(subscribers: int = 1000, sets: int = 10000) -> None:
+    """
+    Benchmark the throughput of Set packages handled by the server while many clients subscribe with SetNotify.
+
+    Subscribed clients are not connected, so the measurements include finding and encoding the notifications,
+    but not sending them.
+
+    :param subscribers: The number of subscribed clients in each measurement.
+    :param sets: The number of Set packages handled for each measurement.
+    """
+    import asyncio
+    import logging
+
+    from time_it import TimeIt
+
+    from MultiServer import Client, Context, DataStorage, process_client_cmd
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    async def run() -> None:
+        ctx = Context("", 0, "", "", 0, 0, False, logger=logger)
+        sender = Client(None, ctx)
+        sender.auth = True
+        sender.team = 0
+        sender.slot = 1
+
+        scenarios = {
+            "no subscribers": ([], []),
+            f"{subscribers} subscribers of the key": (["EnergyLink0"], []),
+            f"{subscribers} subscribers of its prefix": ([], ["EnergyLink"]),
+            f"{subscribers} subscribers of other keys and prefixes": (["Other{index}"], ["Other{index}_"]),
+        }
+        for name, (keys, prefixes) in scenarios.items():
+            ctx.data_storage = DataStorage()
+            clients = [Client(None, ctx) for _ in range(subscribers if keys or prefixes else 0)]
+            for index, client in enumerate(clients):
+                client.auth = True
+                await process_client_cmd(ctx, client, {
+                    "cmd": "SetNotify", "keys": [key.format(index=index) for key in keys]})
+                await process_client_cmd(ctx, client, {
+                    "cmd": "SetNotify", "keys": [prefix.format(index=index) for prefix in prefixes], "prefix": True})
+            with TimeIt(f"{sets} Set with {name}", logger):
+                for _ in range(sets):
+                    await process_client_cmd(ctx, sender, {
+                        "cmd": "Set", "key": "EnergyLink0", "default": 0,
+                        "operations": [{"operation": "add", "value": 1}]})
+                    # let the notification broadcasts run
+                    await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_data_storage_benchmark()
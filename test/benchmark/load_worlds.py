@@ -1,10 +1,15 @@
 def run_load_worlds_benchmark():
     """List worlds and their load time.
     Note that any first-time imports will be attributed to that world, as it is cached afterwards.
-    Likely best used with isolated worlds to measure their time alone."""
+    Likely best used with isolated worlds to measure their time alone.
+    Also compares importing worlds in a new process without the world index (cold) against with it (warm)."""
     import logging
+    import os
+    import subprocess
+    import sys
 
-    from Utils import init_logging
+    from time_it import TimeIt
+    from Utils import init_logging, local_path
 
     # get some general imports cached, to prevent it from being attributed to one world.
     import orjson
@@ -12,11 +17,24 @@ def run_load_worlds_benchmark():
 
     import BaseClasses, Launcher, Fill
 
-    from worlds import world_sources
+    from worlds import world_index_path, world_sources
 
     init_logging("Benchmark Runner")
     logger = logging.getLogger("Benchmark")
 
+    def import_worlds() -> None:
+        subprocess.run([sys.executable, "-c", "import worlds"], cwd=local_path(), check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        os.remove(world_index_path)
+    except FileNotFoundError:
+        pass
+    with TimeIt("importing worlds without the world index (cold)", logger):
+        import_worlds()
+    with TimeIt("importing worlds with the world index (warm)", logger):
+        import_worlds()
+
     for module in world_sources:
         logger.info(f"{module} took {module.time_taken:.4f} seconds.")
 
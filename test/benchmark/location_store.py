@@ -0,0 +1,54 @@
+def run_location_store_benchmark(players: int = 1000, locations_per_player: int = 100, queries: int = 1000) -> None:
+    """
+    Benchmark the receiver and item queries of the LocationStore implementations on a large room.
+
+    The first query of each store includes building its reverse indexes, which is reported separately.
+
+    :param players: The number of players in the benchmarked room.
+    :param locations_per_player: The number of locations each player has.
+    :param queries: The number of queries made for each measurement.
+    """
+    import logging
+    import random
+
+    from time_it import TimeIt
+
+    from NetUtils import LocationStore, _LocationStore
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    rand = random.Random(0)
+    locations = {
+        player: {
+            location: (rand.randrange(1, locations_per_player), rand.randrange(1, players + 1), 0)
+            for location in range(1, locations_per_player + 1)
+        } for player in range(1, players + 1)
+    }
+    slots = [rand.randrange(1, players + 1) for _ in range(queries)]
+    items = [rand.randrange(1, locations_per_player) for _ in range(queries)]
+
+    store_types = {"pure python": _LocationStore}
+    if LocationStore is not _LocationStore:
+        store_types["_speedups"] = LocationStore
+    for name, store_type in store_types.items():
+        store = store_type(locations)
+        size = store.get_size()
+        with TimeIt(f"{name} building reverse indexes", logger):
+            store.get_for_player(1)
+        logger.info(f"{name} reverse indexes take {(store.get_size() - size) / 1024 / 1024:.2f} MiB "
+                    f"on top of {size / 1024 / 1024:.2f} MiB.")
+        with TimeIt(f"{name} {queries} get_for_player", logger):
+            for slot in slots:
+                store.get_for_player(slot)
+        with TimeIt(f"{name} {queries} find_item", logger):
+            for slot, item in zip(slots, items):
+                for _ in store.find_item({slot}, item):
+                    pass
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_location_store_benchmark()
@@ -0,0 +1,52 @@
+def run_oot_rules_benchmark(player_counts: tuple[int, ...] = (1, 20)) -> None:
+    """
+    Benchmark the time taken to create and parse the rules of multiworlds of Ocarina of Time players.
+
+    Rules that are the same for players with the same settings are only compiled once, while transforming them still
+    happens per player, so the time taken per player should fall slightly with more players.
+    Every measurement starts without compiled rules.
+
+    :param player_counts: The numbers of players of the benchmarked multiworlds.
+    """
+    import argparse
+    import gc
+    import logging
+    import time
+
+    from BaseClasses import CollectionState, MultiWorld
+    from Utils import init_logging
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    game = "Ocarina of Time"
+    world_type = AutoWorld.AutoWorldRegister.world_types[game]
+    from worlds.oot import RuleParser
+
+    for players in player_counts:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: game for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        args = argparse.Namespace()
+        for name, option in world_type.options_dataclass.type_hints.items():
+            setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(args)
+        multiworld.state = CollectionState(multiworld)
+        RuleParser.compiled_rules.clear()
+        gc.collect()
+
+        start = time.perf_counter()
+        for step in ("generate_early", "create_regions", "create_items", "set_rules"):
+            call_all(multiworld, step)
+        taken = time.perf_counter() - start
+        logger.info(f"{players} {game} players took {taken:.4f} seconds to create and parse rules, "
+                    f"{taken / players:.4f} seconds per player, compiling {len(RuleParser.compiled_rules)} rules.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_oot_rules_benchmark()
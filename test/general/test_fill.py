@@ -1,10 +1,11 @@
+import typing
 from typing import List, Iterable
 import unittest
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
+    distribute_early_items, distribute_items_restrictive, find_fillable_location
 from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
@@ -463,6 +464,55 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(1, len(player1.prog_items))
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
+    def test_pool_state_matches_sweep(self):
+        """Tests that fill places the same items when collecting and removing only the items that left the pool as when
+        collecting the whole pool for each placement, also when only some players can do so"""
+        from worlds.apquest import APQuestWorld
+        from . import setup_multiworld
+
+        def fill(reversible_players: typing.Set[int]) -> typing.Dict[typing.Tuple[int, str], typing.Tuple[int, str]]:
+            multiworld = setup_multiworld([APQuestWorld, APQuestWorld, APQuestWorld], seed=0)
+            for player, world in multiworld.worlds.items():
+                world.reversible_collection = player in reversible_players
+            locations = multiworld.get_unfilled_locations()
+            multiworld.random.shuffle(locations)
+            item_pool = [item for item in multiworld.itempool if item.advancement]
+            multiworld.random.shuffle(item_pool)
+            fill_restrictive(multiworld, multiworld.state, locations, item_pool)
+            self.assertFalse(item_pool, "Test flawed")
+            return {(location.player, location.name): (location.item.player, location.item.name)
+                    for location in multiworld.get_filled_locations()}
+
+        self.assertTrue(APQuestWorld.reversible_collection, "Test flawed")
+        swept = fill(set())
+        self.assertEqual(swept, fill({1, 2, 3}))
+        self.assertEqual(swept, fill({2}))
+
+    def test_find_fillable_location(self):
+        """Tests `find_fillable_location` returns the first fillable location and caches reachability"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 3, 1)
+        player2 = generate_player_data(multiworld, 2, 1)
+        item = player1.prog_items[0]
+        calls = []
+
+        def rule(state) -> bool:
+            calls.append(state)
+            return False
+
+        set_rule(player1.locations[0], rule)
+        add_item_rule(player1.locations[1], lambda it: it.name != item.name)
+        locations = [player2.locations[0]] + player1.locations
+        known_reachability = {}
+
+        self.assertEqual(0, find_fillable_location(locations, multiworld.state, item))
+        self.assertEqual(3, find_fillable_location(locations, multiworld.state, item, player=1,
+                                                   known_reachability=known_reachability))
+        self.assertEqual(3, find_fillable_location(locations, multiworld.state, item, player=1,
+                                                   known_reachability=known_reachability))
+        self.assertEqual(1, len(calls), "Location access was checked again for the same state")
+        self.assertEqual(1, find_fillable_location(locations, multiworld.state, item, False, 1))
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
@@ -0,0 +1,65 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from worlds.alttp import ALTTPWorld
+from worlds.apquest import APQuestWorld
+from worlds.AutoWorld import call_all
+from . import gen_steps, setup_multiworld
+
+
+class TestIsolatedStages(unittest.TestCase):
+    def test_concurrent_stages_match_sequential(self):
+        """Ensure running isolated stages concurrently produces the same multiworld as running them in order."""
+        world_types = [APQuestWorld, ALTTPWorld, APQuestWorld, APQuestWorld]
+        sequential = setup_multiworld(world_types, seed=0)
+
+        concurrent = setup_multiworld(world_types, (), seed=0)
+        with ThreadPoolExecutor(4) as executor:
+            concurrent.stage_executor = executor
+            for step in gen_steps:
+                call_all(concurrent, step)
+        concurrent.stage_executor = None
+
+        self.assertEqual([(item.player, item.name) for item in concurrent.itempool],
+                         [(item.player, item.name) for item in sequential.itempool])
+        self.assertEqual([(region.player, region.name) for region in concurrent.regions],
+                         [(region.player, region.name) for region in sequential.regions])
+        for player in sequential.player_ids:
+            self.assertEqual([location.name for location in concurrent.get_locations(player)],
+                             [location.name for location in sequential.get_locations(player)])
+
+    def test_isolated_random_is_blocked_per_thread(self):
+        """Ensure isolated steps can't use multiworld.random, while other threads still can."""
+        from unittest.mock import patch
+
+        multiworld = setup_multiworld([APQuestWorld, APQuestWorld], (), seed=0)
+        calls = []
+
+        def create_regions(world: APQuestWorld) -> None:
+            with self.assertRaises(RuntimeError):
+                world.multiworld.random.random()
+            calls.append(world.player)
+
+        with patch.object(APQuestWorld, "create_regions", create_regions), ThreadPoolExecutor(2) as executor:
+            multiworld.stage_executor = executor
+            call_all(multiworld, "create_regions")
+        multiworld.stage_executor = None
+        self.assertEqual(sorted(calls), [1, 2])
+        multiworld.random.random()
+
+    def test_copy(self):
+        """Ensure a multiworld can still be copied, without sharing the thread state used by isolated stages."""
+        from copy import deepcopy
+
+        multiworld = setup_multiworld([APQuestWorld, APQuestWorld], seed=0)
+        with ThreadPoolExecutor(2) as executor:
+            multiworld.stage_executor = executor
+            copied = deepcopy(multiworld)
+        multiworld.stage_executor = None
+
+        self.assertIsNone(copied.stage_executor)
+        self.assertIsNot(copied._thread_itempool, multiworld._thread_itempool)
+        self.assertIsNot(copied._sphere_cache_lock, multiworld._sphere_cache_lock)
+        self.assertEqual([(item.player, item.name) for item in copied.itempool],
+                         [(item.player, item.name) for item in multiworld.itempool])
+        copied.random.random()
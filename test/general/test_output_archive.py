@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+from Main import OutputArchive
+
+
+class TestOutputArchive(unittest.TestCase):
+    def test_members(self) -> None:
+        """Ensure files are deflated unless compressed already, and the archive can be read back."""
+        files = {
+            "AP_1234_P1.aptest": b"PK\x03\x04" + bytes(1000),  # zip based patch container
+            "AP_1234.archipelago": bytes(1000),
+            "AP_1234_Spoiler.txt": b"Spoiler" * 100,
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = os.path.join(temp_dir, "output")
+            os.mkdir(output_dir)
+            for name, data in files.items():
+                with open(os.path.join(output_dir, name), "wb") as f:
+                    f.write(data)
+            archive_path = os.path.join(temp_dir, "AP_1234.zip")
+            with OutputArchive(archive_path) as archive:
+                archive.add_directory(output_dir)
+
+            with zipfile.ZipFile(archive_path) as zf:
+                self.assertIsNone(zf.testzip())
+                self.assertEqual(zf.namelist(), sorted(files))
+                for name, data in files.items():
+                    self.assertEqual(zf.read(name), data)
+                self.assertEqual({info.filename for info in zf.infolist() if info.compress_type == zipfile.ZIP_DEFLATED},
+                                 {"AP_1234_Spoiler.txt"})
+
+    def test_duplicate_name(self) -> None:
+        """Ensure a file name written by two output tasks is refused and no archive is left behind."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for task in ("stage", "1"):
+                os.mkdir(os.path.join(temp_dir, task))
+                with open(os.path.join(temp_dir, task, "AP_1234_P1.txt"), "w") as f:
+                    f.write(task)
+            archive_path = os.path.join(temp_dir, "AP_1234.zip")
+            with self.assertRaises(FileExistsError), OutputArchive(archive_path) as archive:
+                archive.add_directory(os.path.join(temp_dir, "stage"))
+                archive.add_directory(os.path.join(temp_dir, "1"))
+            self.assertFalse(os.path.exists(archive_path))
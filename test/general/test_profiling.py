@@ -0,0 +1,75 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from BaseClasses import CollectionState, Location
+from Profiling import GenerationProfiler
+from worlds.apquest import APQuestWorld
+from worlds.AutoWorld import call_all
+from . import gen_steps, setup_multiworld
+
+
+class TestGenerationProfiler(unittest.TestCase):
+    def test_records_stages_and_counts(self):
+        """Ensure the profiler records stage and world timings and counts logic calls only while entered."""
+        multiworld = setup_multiworld([APQuestWorld, APQuestWorld], (), seed=0)
+        can_reach = Location.__dict__["can_reach"]
+        with GenerationProfiler() as profiler:
+            multiworld.profiler = profiler
+            for step in gen_steps:
+                call_all(multiworld, step)
+            multiworld.can_beat_game(CollectionState(multiworld))
+        self.assertIs(Location.__dict__["can_reach"], can_reach)
+
+        report = profiler.to_dict(multiworld)
+        self.assertEqual(set(report["stages"]), set(gen_steps))
+        for player in multiworld.player_ids:
+            self.assertIn("create_regions", report["worlds"][player]["times"])
+        self.assertGreater(report["counters"]["sweeps"], 0)
+        self.assertGreater(report["counters"]["location_rules"], 0)
+
+        copies = profiler.counters["state_copies"]
+        multiworld.state.copy()
+        self.assertEqual(profiler.counters["state_copies"], copies)
+
+    def test_counts_overrides_once(self):
+        """Ensure overrides of counted methods are counted, and calling the overridden method doesn't count again."""
+        class OverridingLocation(Location):
+            def can_reach(self, state: CollectionState) -> bool:
+                return super().can_reach(state)
+
+        multiworld = setup_multiworld([APQuestWorld], seed=0)
+        region = multiworld.get_region("Overworld", 1)
+        location = OverridingLocation(1, "Overriding Location", None, region)
+        state = CollectionState(multiworld)
+        with GenerationProfiler() as profiler:
+            for _ in range(3):
+                location.can_reach(state)
+        self.assertEqual(profiler.counters["location_rules"], 3)
+
+    def test_counts_other_threads(self):
+        """Ensure calls made on other threads are counted."""
+        multiworld = setup_multiworld([APQuestWorld], seed=0)
+        with GenerationProfiler() as profiler, ThreadPoolExecutor(2) as executor:
+            for future in [executor.submit(multiworld.state.copy) for _ in range(4)]:
+                future.result()
+        self.assertEqual(profiler.counters["state_copies"], 4)
+
+    def test_stops_counting_on_error(self):
+        """Ensure counting stops when generation raises while profiling."""
+        copy = CollectionState.__dict__["copy"]
+        with self.assertRaises(KeyError):
+            with GenerationProfiler():
+                raise KeyError
+        self.assertIs(CollectionState.__dict__["copy"], copy)
+
+    def test_single_counting_profiler(self):
+        """Ensure a second profiler does not count while another one does, and can count once it is done."""
+        multiworld = setup_multiworld([APQuestWorld], seed=0)
+        with GenerationProfiler() as first:
+            with self.assertLogs(level="WARNING"), GenerationProfiler() as second:
+                multiworld.state.copy()
+        self.assertEqual(first.counters["state_copies"], 1)
+        self.assertEqual(second.counters["state_copies"], 0)
+        with GenerationProfiler() as third:
+            multiworld.state.copy()
+        self.assertEqual(third.counters["state_copies"], 1)
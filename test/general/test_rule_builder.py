@@ -4,7 +4,7 @@ from typing import Any, ClassVar, cast
 
 from typing_extensions import override
 
-from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region
+from BaseClasses import CollectionState, Entrance, Item, ItemClassification, Location, MultiWorld, Region
 from NetUtils import JSONMessagePart
 from Options import Choice, FreeText, Option, OptionSet, PerGameCommonOptions, Range, Toggle
 from rule_builder.cached_world import CachedRuleBuilderWorld
@@ -584,6 +584,104 @@ class TestCacheDisabled(RuleBuilderTestCase):
         self.assertTrue(location.can_reach(self.state))
 
 
+class TestIncrementalReachability(CachedRuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    state: CollectionState  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        world.explicit_indirect_conditions = False
+        self.world = world
+        self.state = self.multiworld.state
+
+        region1 = Region("Region 1", self.player, self.multiworld)
+        region2 = Region("Region 2", self.player, self.multiworld)
+        region3 = Region("Region 3", self.player, self.multiworld)
+        region4 = Region("Region 4", self.player, self.multiworld)
+        self.multiworld.regions.extend([region1, region2, region3, region4])
+
+        region2.add_locations({"Location 1": 1}, RuleBuilderLocation)
+        world.create_entrance(region1, region2, Has("Item 1"))
+        world.create_entrance(region1, region3, CanReachRegion("Region 2") & Has("Item 2"))
+        world.create_entrance(region1, region4, CanReachLocation("Location 1"))
+        region1.connect(region2, "Lambda Entrance", lambda state: state.has("Item 3", self.player))
+
+    def test_dependencies(self) -> None:
+        dependencies = self.world.get_entrance("Region 1 -> Region 2").get_reachability_dependencies()
+        assert dependencies is not None
+        self.assertEqual(dependencies.items, {"Item 1"})
+        self.assertEqual(dependencies.regions, set())
+
+        dependencies = self.world.get_entrance("Region 1 -> Region 3").get_reachability_dependencies()
+        assert dependencies is not None
+        self.assertEqual(dependencies.items, {"Item 2"})
+        self.assertEqual(dependencies.regions, {"Region 2"})
+
+        self.assertIsNone(self.world.get_entrance("Region 1 -> Region 4").get_reachability_dependencies())
+        self.assertIsNone(self.world.get_entrance("Lambda Entrance").get_reachability_dependencies())
+
+    def test_dependencies_follow_rule_changes(self) -> None:
+        entrance = self.world.get_entrance("Region 1 -> Region 2")
+        self.assertIsNotNone(entrance.get_reachability_dependencies())
+        entrance.access_rule = lambda state: True
+        self.assertIsNone(entrance.get_reachability_dependencies())
+
+    def test_dependencies_unknown_for_custom_reachability(self) -> None:
+        class CustomEntrance(Entrance):
+            def can_reach(self, state: CollectionState) -> bool:
+                return super().can_reach(state) and state.has("Item 3", self.player)
+
+        entrance = CustomEntrance(self.player, "Custom Entrance", self.world.get_region("Region 1"))
+        self.world.set_rule(entrance, Has("Item 1"))
+        self.assertIsNone(entrance.get_reachability_dependencies())
+
+    def test_reachability(self) -> None:
+        region2 = self.world.get_region("Region 2")
+        region3 = self.world.get_region("Region 3")
+        region4 = self.world.get_region("Region 4")
+        self.state.collect(self.world.create_item("Item 2"))
+        self.assertFalse(region3.can_reach(self.state))
+
+        # region 3 is only retried because region 2 gets reached during the same update
+        self.state.collect(self.world.create_item("Item 1"))
+        self.assertTrue(region2.can_reach(self.state))
+        self.assertTrue(region3.can_reach(self.state))
+        self.assertTrue(region4.can_reach(self.state))
+
+    def test_opaque_rules(self) -> None:
+        region2 = self.world.get_region("Region 2")
+        self.assertFalse(region2.can_reach(self.state))
+        self.state.collect(self.world.create_item("Item 3"))
+        self.assertTrue(region2.can_reach(self.state))
+
+    def test_remove(self) -> None:
+        region2 = self.world.get_region("Region 2")
+        item = self.world.create_item("Item 1")
+        self.state.collect(item)
+        self.assertTrue(region2.can_reach(self.state))
+        self.state.remove(item)
+        self.assertFalse(region2.can_reach(self.state))
+        self.state.collect(item)
+        self.assertTrue(region2.can_reach(self.state))
+
+
+class TestIncrementalReachabilityCacheDisabled(RuleBuilderTestCase):
+    def test_dependencies_unknown(self) -> None:
+        multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = multiworld.worlds[1]
+        region1 = Region("Region 1", 1, multiworld)
+        region2 = Region("Region 2", 1, multiworld)
+        multiworld.regions.extend([region1, region2])
+        entrance = world.create_entrance(region1, region2, Has("Item 1"))
+        self.assertIsNone(entrance.get_reachability_dependencies())
+
+
 class TestRules(RuleBuilderTestCase):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
     world: World  # pyright: ignore[reportUninitializedInstanceVariable]
@@ -27,3 +27,47 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestSphereCache(unittest.TestCase):
+    def test_cached_spheres_match_uncached(self):
+        """Ensure the sphere cache produces the same spheres and accessibility as walking through the spheres."""
+        from Fill import distribute_items_restrictive
+        from worlds.alttp import ALTTPWorld
+        from worlds.apquest import APQuestWorld
+        from . import setup_multiworld
+
+        multiworld = setup_multiworld([ALTTPWorld, APQuestWorld], seed=0)
+        distribute_items_restrictive(multiworld)
+
+        spheres = list(multiworld.get_sendable_spheres())
+        accessible = multiworld.fulfills_accessibility()
+        self.assertIs(multiworld.cache_spheres(), multiworld.cache_spheres())
+        self.assertEqual(list(multiworld.get_sendable_spheres()), spheres)
+        self.assertEqual(multiworld.fulfills_accessibility(), accessible)
+
+    def test_placements_clear_cache(self):
+        """Ensure the sphere cache is recorded again after items are swapped and is not modified by checking it."""
+        from Fill import distribute_items_restrictive, swap_location_item
+        from worlds.alttp import ALTTPWorld
+        from worlds.apquest import APQuestWorld
+        from . import setup_multiworld
+
+        multiworld = setup_multiworld([ALTTPWorld, APQuestWorld], seed=0)
+        distribute_items_restrictive(multiworld)
+
+        sphere_cache = multiworld.cache_spheres()
+        prog_items = {player: counter.copy() for player, counter in sphere_cache.state.prog_items.items()}
+        multiworld.fulfills_accessibility()
+        self.assertEqual(sphere_cache.state.prog_items, prog_items)
+
+        location_1, location_2 = multiworld.get_filled_locations(2)[:2]
+        swap_location_item(location_1, location_2)
+        self.assertIsNone(multiworld.sphere_cache)
+        sphere_cache = multiworld.cache_spheres()
+        self.assertIsNot(sphere_cache, None)
+
+        item, location_1.item = location_1.item, None
+        multiworld.push_item(location_1, item, False)
+        self.assertIsNone(multiworld.sphere_cache)
+        self.assertIsNot(multiworld.cache_spheres(), sphere_cache)
@@ -0,0 +1,74 @@
+import os
+import pickle
+import tempfile
+import unittest
+from io import BytesIO
+
+from Utils import cache_path
+from worlds.AutoWorld import AutoWorldRegister
+from worlds.StaticData import StaticDataUnpickler, cache_static_data
+
+
+class TestStaticData(unittest.TestCase):
+    def setUp(self) -> None:
+        AutoWorldRegister.world_types["APQuest"]  # import the world the tested builders pretend to belong to
+        self.original_cache_path = getattr(cache_path, "cached_path", None)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        cache_path.cached_path = self.temp_dir.name
+
+    def tearDown(self) -> None:
+        cache_path.cached_path = self.original_cache_path
+        self.temp_dir.cleanup()
+
+    def test_cached(self) -> None:
+        """Test that static data of a world is built once and loaded from the cache later."""
+        calls: list[int] = []
+
+        def build() -> dict[str, set[int]]:
+            calls.append(1)
+            return {"data": {1, 2}}
+
+        build.__module__ = "worlds.apquest.test_data"
+        self.assertEqual(cache_static_data(build)(), {"data": {1, 2}})
+        self.assertEqual(len(os.listdir(cache_path("static_data"))), 1)
+        cached = cache_static_data(build)
+        self.assertEqual(cached(), {"data": {1, 2}})
+        self.assertIs(cached(), cached())
+        self.assertEqual(len(calls), 1)
+
+    def test_forbidden_globals(self) -> None:
+        """Test that data referring to anything but its world and basic types is built every time, but stored once."""
+        calls: list[int] = []
+
+        def build() -> object:
+            calls.append(1)
+            return TestStaticData
+
+        build.__module__ = "worlds.apquest.test_data"
+        cache_static_data(build)()
+        [cache_file] = os.listdir(cache_path("static_data"))
+        modified = os.stat(cache_path("static_data", cache_file)).st_mtime_ns
+        self.assertIs(cache_static_data(build)(), TestStaticData)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(os.listdir(cache_path("static_data")), [cache_file])
+        self.assertEqual(os.stat(cache_path("static_data", cache_file)).st_mtime_ns, modified)
+
+    def test_world_classes(self) -> None:
+        """Test that only classes defined by the modules of the world can be loaded."""
+        from worlds.apquest.items import APQuestItem
+
+        def load(module: str, name: str) -> object:
+            return StaticDataUnpickler(BytesIO(f"c{module}\n{name}\n.".encode()), "worlds.apquest").load()
+
+        self.assertIs(load("worlds.apquest.items", "APQuestItem"), APQuestItem)
+        for module, name in (("worlds.apquest.items", "Item"),  # imported from BaseClasses
+                             ("worlds.apquest.items", "APQuestItem.__init__"),
+                             ("worlds.apquest.items", "TYPE_CHECKING"),
+                             ("worlds.apquest.not_imported", "Data")):
+            with self.subTest(module=module, name=name), self.assertRaises(pickle.UnpicklingError):
+                load(module, name)
+
+    def test_not_a_world(self) -> None:
+        """Test that builders outside of worlds are not cached to disk."""
+        self.assertEqual(cache_static_data(lambda: 1)(), 1)
+        self.assertFalse(os.path.exists(cache_path("static_data")))
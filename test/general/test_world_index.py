@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import patch
+
+import worlds
+from worlds import IndexedGamesPackages, get_world_index_entry, get_world_infos, network_data_package
+from worlds.AutoWorld import AutoWorldRegister, WorldTypes
+
+
+class TestWorldIndex(unittest.TestCase):
+    def test_lazy_world_types(self) -> None:
+        """Test that games registered lazily are only imported on access of their world type."""
+        world_type = AutoWorldRegister.world_types["APQuest"]
+        loaded: list[str] = []
+        world_types = WorldTypes()
+
+        def load() -> None:
+            loaded.append("APQuest")
+            world_types["APQuest"] = world_type
+
+        world_types.register_lazy("APQuest", load, get_world_index_entry(world_type))
+        self.assertIn("APQuest", world_types)
+        self.assertEqual(list(world_types), ["APQuest"])
+        self.assertEqual(len(world_types), 1)
+        self.assertEqual(world_types.copy().infos, world_types.infos)
+        self.assertFalse(loaded)
+
+        self.assertIs(world_types["APQuest"], world_type)
+        self.assertIs(world_types["APQuest"], world_type)
+        self.assertEqual(loaded, ["APQuest"])
+        self.assertFalse(world_types.loaders)
+        self.assertFalse(world_types.infos)
+        self.assertIsNone(world_types.get("Unknown Game"))
+
+    def test_lazy_views(self) -> None:
+        """Test that views of the world types import each world when reached and skip ones that fail to register."""
+        world_type = AutoWorldRegister.world_types["APQuest"]
+        loaded: list[str] = []
+        world_types = WorldTypes()
+
+        def load() -> None:
+            loaded.append("APQuest")
+            world_types["APQuest"] = world_type
+
+        world_types.register_lazy("Broken Game", lambda: None, {})
+        world_types.register_lazy("APQuest", load, get_world_index_entry(world_type))
+        self.assertEqual(list(world_types.keys()), ["Broken Game", "APQuest"])
+        values = world_types.values()
+        self.assertFalse(loaded)
+        self.assertEqual(list(values), [world_type])
+        self.assertEqual(list(world_types.items()), [("APQuest", world_type)])
+        self.assertEqual(loaded, ["APQuest"])
+
+    def test_failed_lazy_world(self) -> None:
+        """Test that a game whose world fails to register is treated as missing."""
+        world_types = WorldTypes()
+        world_types.register_lazy("Broken Game", lambda: None, {})
+        self.assertIsNone(world_types.get("Broken Game"))
+        self.assertNotIn("Broken Game", world_types)
+        with self.assertRaises(KeyError):
+            world_types["Broken Game"]
+
+    def test_lazy_games_packages(self) -> None:
+        """Test that data packages of indexed games fall back to their world if not cached."""
+        checksum = network_data_package["games"]["APQuest"]["checksum"]
+        games = IndexedGamesPackages({"APQuest": checksum, "Unknown Game": checksum})
+        self.assertIn("APQuest", games)
+        self.assertEqual(len(games), 2)
+        self.assertEqual(games["APQuest"], AutoWorldRegister.world_types["APQuest"].get_data_package_data())
+        with self.assertRaises(KeyError):
+            games["Other Game"]
+
+    def test_world_infos(self) -> None:
+        """Test that the info of every game matches its world, apart from checksums of data differing by process."""
+        infos = get_world_infos()
+        self.assertEqual(set(infos), set(AutoWorldRegister.world_types))
+        for game, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest(game=game):
+                info = {**infos[game], "checksum": None}
+                self.assertEqual(info, {**get_world_index_entry(world_type), "checksum": None})
+
+    def test_registrations(self) -> None:
+        """Test that patch containers and clients are attributed to the world that registered them."""
+        import worlds.alttp  # noqa: F401
+        registrations = worlds._get_registrations()
+        self.assertIn(("patch_suffixes", ".aplttp", "worlds.alttp.Rom"), registrations)
+        self.assertIn(("sni_clients", "A Link to the Past", "worlds.alttp.Client"), registrations)
+
+    def test_load_registered_worlds(self) -> None:
+        """Test that only the sources that registered what is looked up are imported."""
+        loaded: list[str] = []
+        registrations = {"a": {"patch_suffixes": [".apa"]}, "b": {"sni_clients": ["B"], "bizhawk_systems": ["GBA"]}}
+        loaders = {path: lambda path=path: loaded.append(path) for path in ("a", "b", "c")}
+        with patch.dict(worlds._source_registrations, registrations, clear=True), \
+                patch.dict(worlds._source_loaders, loaders, clear=True):
+            worlds.load_registered_worlds("patch_suffixes", ".apb")
+            self.assertFalse(loaded)
+            worlds.load_registered_worlds("sni_clients")
+            worlds.load_registered_worlds("bizhawk_systems", "GBA")
+            self.assertEqual(loaded, ["b"])
+            worlds.load_registered_worlds("patch_suffixes", ".apa")
+            self.assertEqual(loaded, ["b", "a"])
+            self.assertEqual(list(worlds._source_loaders), ["c"])
@@ -112,6 +112,20 @@ class Base:
             self.assertEqual(sorted(self.store.find_item(set(range(2048)), 13)),
                              [(1, 13, 13, 1, 0)])
 
+        def test_find_item_order(self) -> None:
+            for slots in ({3, 4}, {1, 2}, {2}):
+                for item in (11, 12, 21, 99):
+                    expected = [(sender, location, item_id, receiver, flags)
+                                for sender, locations in self.store.items()
+                                for location, (item_id, receiver, flags) in locations.items()
+                                if item_id == item and receiver in slots]
+                    self.assertEqual(list(self.store.find_item(slots, item)), expected)
+
+        def test_reverse_index_size(self) -> None:
+            size = self.store.get_size()
+            self.store.get_for_player(1)
+            self.assertGreater(self.store.get_size(), size)
+
         def test_get_for_player(self) -> None:
             self.assertEqual(self.store.get_for_player(3), {4: {9}})
             self.assertEqual(self.store.get_for_player(1), {1: {13}, 2: {22, 23}})
@@ -0,0 +1,137 @@
+# Tests for the sectioned multidata container
+import io
+import unittest
+import zlib
+
+from MultiServer import Context
+from NetUtils import Hint, MultiDataSections, NetworkSlot, SlotType, dump_multidata, encode_multidata, \
+    multidata_format_version
+from Utils import restricted_dumps
+
+sample_multidata = {
+    "slot_data": {1: {"option": 1}, 2: {"option": [2, 3]}},
+    "slot_info": {1: NetworkSlot("Player1", "Game", SlotType.player),
+                  2: NetworkSlot("Player2", "Game", SlotType.player)},
+    "locations": {1: {10: (20, 2, 0)}, 2: {11: (21, 1, 1)}},
+    "precollected_hints": {1: {Hint(2, 1, 10, 20, False)}, 2: set()},
+    "seed_name": "1234",
+    "spheres": [{1: {10}}, {2: {11}}],
+    "datapackage": {"Game": {"item_name_to_id": {"Item": 20}, "checksum": "abc"}},
+}
+
+
+class TestMultiDataSections(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """Ensure all entries can be read back from the sectioned format, and only accessed sections are loaded."""
+        data = encode_multidata(sample_multidata)
+        self.assertEqual(data[0], multidata_format_version)
+
+        multidata = Context.decompress(data)
+        self.assertIsInstance(multidata, MultiDataSections)
+        self.assertEqual(list(multidata), list(sample_multidata))
+        self.assertEqual(multidata["seed_name"], "1234")
+        self.assertEqual(multidata["slot_data"][2], {"option": [2, 3]})
+        self.assertNotIn(1, multidata["slot_data"]._loaded)
+        self.assertNotIn("spheres", multidata._loaded)
+        self.assertEqual({key: multidata[key] for key in multidata if key != "slot_data"},
+                         {key: value for key, value in sample_multidata.items() if key != "slot_data"})
+        self.assertEqual(dict(multidata["slot_data"]), sample_multidata["slot_data"])
+
+    def test_dump(self) -> None:
+        """Ensure writing to a file produces the same container as encoding to bytes."""
+        file = io.BytesIO()
+        dump_multidata(sample_multidata, file)
+        self.assertEqual(file.getvalue(), encode_multidata(sample_multidata))
+        self.assertEqual(dict(MultiDataSections(file.getvalue())["slot_data"]), sample_multidata["slot_data"])
+
+    def test_mutation(self) -> None:
+        """Ensure entries can be replaced and removed like in a dict and re-encoded."""
+        multidata = MultiDataSections(encode_multidata(sample_multidata))
+        self.assertEqual(multidata.pop("locations"), sample_multidata["locations"])
+        self.assertNotIn("locations", multidata)
+        multidata["datapackage"] = {}
+        with self.assertRaises(KeyError):
+            del multidata["locations"]
+
+        reencoded = MultiDataSections(encode_multidata(multidata))
+        self.assertEqual(reencoded["datapackage"], {})
+        self.assertNotIn("locations", reencoded)
+
+    def test_v3(self) -> None:
+        """Ensure multidata in the previous single pickle format can still be read."""
+        data = bytes([3]) + zlib.compress(restricted_dumps(sample_multidata))
+        self.assertEqual(Context.decompress(data), sample_multidata)
+
+    def test_invalid(self) -> None:
+        """Ensure empty, truncated and newer multidata are rejected with a descriptive error."""
+        from Utils import VersionException
+
+        with self.assertRaisesRegex(ValueError, "empty"):
+            Context.decompress(b"")
+        data = encode_multidata(sample_multidata)
+        for length in (1, 3, len(data) // 2, len(data) - 1):
+            with self.subTest(length=length), self.assertRaisesRegex(ValueError, "truncated"):
+                Context.decompress(data[:length])
+        with self.assertRaisesRegex(VersionException, "Update the server"):
+            Context.decompress(bytes([multidata_format_version + 1]) + data[1:])
+
+    def test_load_empty_file(self) -> None:
+        """Ensure loading an empty multidata file fails with a descriptive error."""
+        import os
+        import tempfile
+        from unittest import mock
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "empty.archipelago")
+            open(path, "wb").close()
+            with mock.patch.object(Context, "_load_game_data"):
+                ctx = Context("", 0, "", "", 0, 0, False)
+            with self.assertRaisesRegex(ValueError, "empty"):
+                ctx.load(path)
+
+    def test_concurrent_loading(self) -> None:
+        """Ensure sections accessed from multiple threads at once are only loaded once."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+
+        import NetUtils
+
+        multidata = MultiDataSections(encode_multidata(sample_multidata))
+        barrier = threading.Barrier(4)
+
+        def load(key: str):
+            barrier.wait()
+            return multidata[key] if key != "slot_data" else multidata["slot_data"][1]
+
+        with mock.patch("NetUtils.restricted_loads", wraps=NetUtils.restricted_loads) as loads:
+            with ThreadPoolExecutor(4) as executor:
+                spheres = list(executor.map(load, ["spheres"] * 4))
+                slot_data = list(executor.map(load, ["slot_data"] * 4))
+        self.assertEqual(loads.call_count, 2)
+        self.assertTrue(all(value is spheres[0] for value in spheres))
+        self.assertTrue(all(value is slot_data[0] for value in slot_data))
+
+    def test_close(self) -> None:
+        """Ensure closing releases a memory mapped file, and sections that were loaded stay available."""
+        import mmap
+        import os
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "multidata.archipelago")
+            with open(path, "wb") as f:
+                dump_multidata(sample_multidata, f)
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            multidata = MultiDataSections(data)
+            slot_data = multidata["slot_data"]
+            self.assertEqual(slot_data[1], sample_multidata["slot_data"][1])
+
+            multidata.close()
+            self.assertTrue(data.closed)
+            self.assertEqual(multidata["seed_name"], "1234")
+            self.assertEqual(slot_data[1], sample_multidata["slot_data"][1])
+            with self.assertRaises(ValueError):
+                slot_data[2]
+            os.remove(path)
@@ -1,5 +1,16 @@
+import asyncio
+import copy
+import gc
+import os
+import tempfile
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+import zlib
+from unittest import mock
+
+from MultiServer import Client, Context, DataStorage, ServerCommandProcessor, collect_player, process_client_cmd, \
+    register_location_checks, send_items_to, send_new_items
+from NetUtils import Hint, HintStatus, LocationStore, NetworkItem, NetworkSlot, SlotType, decode
+from Utils import restricted_loads
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +49,283 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.save_filename = os.path.join(self.temp_dir.name, "test.apsave")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def new_context(self) -> Context:
+        # game data is not saved, and loading it again for every context would fail
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.connect_names = {"Player1": (0, 1), "Player2": (0, 2)}
+        ctx.save_filename = self.save_filename
+        ctx.journal_filename = self.save_filename + ".journal"
+        return ctx
+
+    def load_context(self) -> Context:
+        ctx = self.new_context()
+        with open(self.save_filename, "rb") as f:
+            ctx.set_save(restricted_loads(zlib.decompress(f.read())))
+        ctx._replay_journal()
+        return ctx
+
+    def test_journal_replay(self) -> None:
+        """Ensure saves after the first snapshot are journaled and replayed on load."""
+        ctx = self.new_context()
+        self.assertTrue(ctx._save())
+        snapshot_size = os.path.getsize(self.save_filename)
+
+        ctx.received_items[0, 2, True] = [NetworkItem(1, 10, 1, 0)]
+        ctx.location_checks[0, 1] |= {10}
+        ctx.changed_location_checks.add((0, 1))
+        ctx.data_storage.set("key", 1)
+        self.assertTrue(ctx._save())
+        ctx.received_items[0, 2, True].append(NetworkItem(2, 11, 1, 0))
+        ctx.location_checks[0, 1] |= {11}
+        ctx.changed_location_checks.add((0, 1))
+        ctx.name_aliases[0, 1] = "Alias"
+        self.assertTrue(ctx._save())
+        self.assertEqual(os.path.getsize(self.save_filename), snapshot_size, "saves should have been journaled")
+
+        loaded = self.load_context()
+        self.assertEqual(loaded.received_items, ctx.received_items)
+        self.assertEqual(loaded.location_checks, ctx.location_checks)
+        self.assertEqual(loaded.data_storage.data, ctx.data_storage.data)
+        self.assertEqual(loaded.name_aliases, ctx.name_aliases)
+
+    def test_compaction(self) -> None:
+        """Ensure a snapshot contains all changes and the journal of the previous snapshot is not replayed."""
+        ctx = self.new_context()
+        self.assertTrue(ctx._save())
+        ctx.data_storage.set("key", 1)
+        self.assertTrue(ctx._save())
+        with open(ctx.journal_filename, "rb") as f:
+            old_journal = f.read()
+
+        ctx.data_storage.set("key", 2)
+        self.assertTrue(ctx._save(exit_save=True))
+        # a journal left behind by an interrupted compaction must not overwrite newer data
+        with open(ctx.journal_filename, "wb") as f:
+            f.write(old_journal)
+
+        loaded = self.load_context()
+        self.assertEqual(loaded.data_storage.data, {"key": 2})
+
+
+class TestHintIndex(unittest.TestCase):
+    def test_location_recheck_matches_full_recheck(self) -> None:
+        """Ensure rechecking the hints of checked locations updates hints like rechecking every hint does."""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        hints = [Hint(2, 1, 10, 100, False), Hint(1, 1, 11, 101, False), Hint(1, 2, 20, 102, False)]
+        for hint in hints:
+            ctx.hints[0, hint.finding_player].add(hint)
+            ctx.hints[0, hint.receiving_player].add(hint)
+        ctx.index_hints()
+        self.assertEqual(ctx.get_hint(0, 1, 10), hints[0])
+        self.assertIsNone(ctx.get_hint(0, 2, 10))
+
+        ctx.location_checks[0, 1] |= {10, 12}
+        changed: set[tuple[int, int]] = set()
+        ctx.recheck_location_hints(0, 1, {10, 12}, changed)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        found_hint = hints[0]._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(ctx.get_hint(0, 1, 10), found_hint)
+
+        rechecked = {key: set(value) for key, value in ctx.hints.items()}
+        ctx.recheck_hints()
+        self.assertEqual(ctx.hints, rechecked)
+        self.assertIn(found_hint, ctx.hints[0, 2])
+
+
+class TestDataPackageCache(unittest.TestCase):
+    def test_spliced_data_package(self) -> None:
+        """Ensure DataPackage messages spliced from cached game packages decode like directly encoded ones."""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.gamespackage = {
+            "Game A": {"item_name_to_id": {"Sword": 1}, "location_name_to_id": {"Chest": 2}, "checksum": "a"},
+            "Game \"B\"": {"item_name_to_id": {"Shield": 3}, "location_name_to_id": {}, "checksum": "b"},
+            "Unversioned": {"item_name_to_id": {}, "location_name_to_id": {"Pot": 4}},
+        }
+        self.addCleanup(Context.encoded_game_packages.clear)
+        expected = [{"cmd": "DataPackage", "data": {"games": ctx.gamespackage}}]
+        self.assertEqual(decode(ctx.get_data_package_msg(ctx.gamespackage)), expected)
+        self.assertIn(("Game A", "a"), Context.encoded_game_packages)
+        self.assertNotIn(("Unversioned", None), Context.encoded_game_packages)
+        self.assertEqual(decode(ctx.get_data_package_msg([])), [{"cmd": "DataPackage", "data": {"games": {}}}])
+
+    def test_cache_limit(self) -> None:
+        """Ensure only the most recently used game packages are kept encoded."""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.gamespackage = {game: {"item_name_to_id": {}, "location_name_to_id": {}, "checksum": game}
+                            for game in ("A", "B", "C")}
+        self.addCleanup(Context.encoded_game_packages.clear)
+        with mock.patch.object(Context, "encoded_game_packages_limit", 2):
+            ctx.get_encoded_game_package("A")
+            ctx.get_encoded_game_package("B")
+            ctx.get_encoded_game_package("A")
+            ctx.get_encoded_game_package("C")
+        self.assertEqual(list(Context.encoded_game_packages), [("A", "A"), ("C", "C")])
+
+
+class TestItemDelivery(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesced_delivery(self) -> None:
+        """Ensure only receiving slots are visited and items sent within one tick arrive as one message."""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        receiver = Client(mock.Mock(), ctx)
+        bystander = Client(mock.Mock(), ctx)
+        for client in (receiver, bystander):
+            client.items_handling = 0b111
+        ctx.clients = {0: {1: [receiver], 2: [bystander]}}
+
+        with mock.patch.object(ctx, "send_msgs") as send_msgs:
+            send_items_to(ctx, 0, 1, NetworkItem(10, 100, 2, 0))
+            send_new_items(ctx)
+            send_items_to(ctx, 0, 1, NetworkItem(11, 101, 2, 0))
+            send_new_items(ctx)
+            send_msgs.assert_not_called()
+            await asyncio.sleep(0)
+
+            send_msgs.assert_called_once_with(receiver, [{
+                "cmd": "ReceivedItems", "index": 0,
+                "items": [NetworkItem(10, 100, 2, 0), NetworkItem(11, 101, 2, 0)]}])
+        self.assertEqual(receiver.send_index, 2)
+        self.assertEqual(bystander.send_index, 0)
+        self.assertFalse(ctx.dirty_slots)
+
+
+class TestBulkLocationChecks(unittest.IsolatedAsyncioTestCase):
+    @staticmethod
+    def new_context() -> Context:
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.locations = LocationStore({
+            1: {100: (10, 3, 0), 101: (11, 2, 0)},
+            2: {200: (20, 3, 0), 201: (21, 1, 0)},
+            3: {300: (30, 1, 0)},
+        })
+        ctx.clients = {0: {1: [], 2: [], 3: []}}
+        ctx.player_names = {(0, slot): f"Player{slot}" for slot in (1, 2, 3)}
+        ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2, 3)}
+        return ctx
+
+    async def test_collect_matches_single_checks(self) -> None:
+        """Ensure collecting in bulk registers the same checks and items as checking each slot separately."""
+        single_ctx = self.new_context()
+        for slot, locations in ((1, [100]), (2, [200])):
+            register_location_checks(single_ctx, 0, slot, locations, count_activity=False)
+
+        bulk_ctx = self.new_context()
+        with mock.patch.object(bulk_ctx, "save") as save, mock.patch.object(bulk_ctx, "broadcast_team") as broadcast:
+            collect_player(bulk_ctx, 0, 3)
+        save.assert_called_once()
+        self.assertEqual(len(broadcast.call_args.args[1]), 2)
+
+        self.assertEqual(bulk_ctx.location_checks, single_ctx.location_checks)
+        self.assertEqual(bulk_ctx.received_items, single_ctx.received_items)
+        self.assertEqual(bulk_ctx.changed_location_checks, {(0, 1), (0, 2)})
+
+
+class TestDataStorage(unittest.TestCase):
+    def test_subscriptions(self) -> None:
+        """Ensure exact and prefix subscribers are notified only of keys they subscribed to."""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        exact, prefix, other = (Client(mock.Mock(), ctx) for _ in range(3))
+        storage = DataStorage()
+        storage.subscribe(exact, "EnergyLink0")
+        storage.subscribe(prefix, "EnergyLink", prefix=True)
+        storage.subscribe(other, "Other", prefix=True)
+        storage.subscribe(other, "Wildcard*")
+        storage.subscribe(other, "_read_hints_0_1")
+
+        self.assertEqual(storage.get_subscribers("EnergyLink0"), {exact, prefix})
+        self.assertEqual(storage.get_subscribers("EnergyLink1"), {prefix})
+        self.assertEqual(storage.get_subscribers("Energy"), set())
+        self.assertEqual(storage.get_subscribers("_read_hints_0_1"), {other})
+        # without the prefix flag, a trailing * is part of the key
+        self.assertEqual(storage.get_subscribers("Wildcard1"), set())
+        self.assertEqual(storage.get_subscribers("Wildcard*"), {other})
+
+        del prefix
+        gc.collect()  # clients reference themselves through their message processor
+        self.assertEqual(storage.get_subscribers("EnergyLink1"), set())
+        self.assertNotIn("EnergyLink", storage.prefix_subscribers)
+        self.assertEqual(set(storage.prefix_lengths), {len("Other")})
+
+    def test_dirty(self) -> None:
+        """Ensure every set bumps the version of its key and marks it changed until taken."""
+        storage = DataStorage()
+        self.assertEqual(storage.set("key", 1), 1)
+        self.assertEqual(storage.set("key", 2), 2)
+        self.assertEqual(storage.versions["key"], 2)
+        self.assertEqual(storage.take_dirty(), {"key"})
+        self.assertEqual(storage.take_dirty(), set())
+        self.assertEqual(storage.get("key"), 2)
+
+
+class TestSet(unittest.IsolatedAsyncioTestCase):
+    async def test_original_value(self) -> None:
+        """Ensure Set only keeps the original value when the reply is sent to someone."""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        client = Client(mock.Mock(), ctx)
+        client.auth = True
+        client.slot = 1
+        set_list = {"cmd": "Set", "key": "list", "default": [], "operations": [{"operation": "add", "value": [1]}]}
+
+        with mock.patch.object(ctx, "save"), mock.patch.object(ctx, "broadcast") as broadcast, \
+                mock.patch("MultiServer.copy.copy", wraps=copy.copy) as copy_value:
+            await process_client_cmd(ctx, client, dict(set_list))
+            copy_value.assert_not_called()
+            broadcast.assert_not_called()
+
+            await process_client_cmd(ctx, client, {**set_list, "want_reply": True})
+            copy_value.assert_called_once()
+            reply = broadcast.call_args.args[1][0]
+            self.assertEqual(reply["original_value"], [1])
+            self.assertEqual(reply["value"], [1, 1])
+        self.assertEqual(ctx.data_storage.versions["list"], 2)
+
+
+class TestBounceRouting(unittest.TestCase):
+    def test_targets(self) -> None:
+        """Ensure bounce targets follow connecting, tag changes and disconnecting clients of the same team."""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.games = {1: "Game A", 2: "Game B"}
+        ctx.clients = {0: {1: [], 2: []}, 1: {1: [], 2: []}}
+
+        def connect(team: int, slot: int, tags: list[str]) -> Client:
+            client = Client(mock.Mock(), ctx)
+            client.team, client.slot, client.tags = team, slot, tags
+            ctx.clients[team][slot].append(client)
+            ctx.route_client(client)
+            return client
+
+        linked = connect(0, 1, ["DeathLink"])
+        plain = connect(0, 2, [])
+        other_team = connect(1, 1, ["DeathLink"])
+
+        self.assertEqual(ctx.get_bounce_targets(0, set(), {"DeathLink"}, set()), {linked})
+        self.assertEqual(ctx.get_bounce_targets(0, {"Game B"}, set(), set()), {plain})
+        self.assertEqual(ctx.get_bounce_targets(0, set(), set(), {1, 2, 3}), {linked, plain})
+        self.assertEqual(ctx.get_bounce_targets(1, {"Game A"}, {"DeathLink"}, set()), {other_team})
+
+        ctx.unroute_client(plain)
+        plain.tags = ["DeathLink"]
+        ctx.route_client(plain)
+        self.assertEqual(ctx.get_bounce_targets(0, set(), {"DeathLink"}, set()), {linked, plain})
+
+        ctx.unroute_client(linked)
+        self.assertEqual(ctx.get_bounce_targets(0, {"Game A"}, {"DeathLink"}, set()), {plain})
+        self.assertNotIn("Game A", ctx.game_clients[0])
@@ -0,0 +1,47 @@
+# Tests for restricted pickling in Utils.py
+
+import os
+import pickle
+import unittest
+from collections import Counter
+
+from NetUtils import Hint, HintStatus, NetworkSlot, SlotType
+from Utils import Version, restricted_dump, restricted_dumps, restricted_loads
+
+
+class TestRestrictedDumps(unittest.TestCase):
+    def test_allowed(self) -> None:
+        """Ensure data the restricted unpickler accepts is pickled like pickle.dumps does."""
+        data = {
+            "sets": ({1, 2}, frozenset({3})),
+            "counter": Counter(a=1),
+            "hint": Hint(1, 2, 3, 4, False, "", 0, HintStatus.HINT_FOUND),
+            "slot": NetworkSlot("Player1", "Game", SlotType.player),
+        }
+        dumped = restricted_dumps(data)
+        self.assertEqual(dumped, pickle.dumps(data))
+        self.assertEqual(restricted_loads(dumped), data)
+
+    def test_forbidden(self) -> None:
+        """Ensure globals the restricted unpickler refuses are refused while pickling."""
+        class ByName:
+            def __reduce__(self) -> str:
+                return "system"
+
+        class Plain:
+            pass
+
+        for obj in (os.system, object(), Version(0, 6, 0), [pickle.loads], bytearray(b"data"), ByName(),
+                    [Plain(), Plain()]):
+            with self.subTest(obj=obj), self.assertRaises(pickle.PicklingError):
+                restricted_dumps(obj)
+
+    def test_dump(self) -> None:
+        """Ensure restricted_dump writes the same pickle to a file as restricted_dumps returns."""
+        import io
+
+        data = {"hints": [Hint(1, 2, 3, 4, False), Hint(2, 1, 4, 3, True)], "counter": Counter(b=2)}
+        file = io.BytesIO()
+        restricted_dump(data, file)
+        self.assertEqual(file.getvalue(), restricted_dumps(data))
+        self.assertEqual(restricted_loads(file.getvalue()), data)
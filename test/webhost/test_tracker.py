@@ -1,3 +1,4 @@
+import datetime
 import os
 import pickle
 from pathlib import Path
@@ -103,3 +104,22 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_tracker_data_cache(self) -> None:
+        """Verify that tracker data of a room is decoded once and reloaded when the room saves."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            first = TrackerData(room)
+            second = TrackerData(room)
+            self.assertIs(first._multidata, second._multidata)
+            self.assertIs(first._multisave, second._multisave)
+            for game in first.item_id_to_name:
+                self.assertIs(first.item_id_to_name[game], second.item_id_to_name[game])
+
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1}}})
+            room.last_activity = room.last_activity + datetime.timedelta(seconds=1)
+            self.assertEqual(TrackerData(room).get_player_checked_locations(0, 1), {1})
@@ -5,7 +5,8 @@ import logging
 import pathlib
 import sys
 import time
-from collections.abc import Callable, Iterable, Mapping
+from collections.abc import Callable, Iterable, ItemsView, Iterator, KeysView, Mapping, ValuesView
+from concurrent.futures import Executor, wait
 from random import Random
 from typing import (Any, ClassVar, Dict, FrozenSet, List, Optional, Self, Set, TextIO, Tuple,
                     TYPE_CHECKING, Type, Union)
@@ -27,8 +28,105 @@ class InvalidItemError(KeyError):
     pass
 
 
+class LazyValuesView(ValuesView):
+    """Values of a lazily loaded mapping, loading each value when it is reached and skipping ones that fail to load."""
+
+    def __iter__(self) -> Iterator[Any]:
+        for key in self._mapping:
+            try:
+                yield self._mapping[key]
+            except KeyError:
+                continue
+
+
+class LazyItemsView(ItemsView):
+    """Items of a lazily loaded mapping, loading each value when it is reached and skipping ones that fail to load."""
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        for key in self._mapping:
+            try:
+                yield key, self._mapping[key]
+            except KeyError:
+                continue
+
+
+class WorldTypes(Dict[str, Type["World"]]):
+    """
+    The registered world types by game.
+
+    Games can be registered before their world is imported, with a loader that imports it on first access of the world
+    type. Checking for a game and iterating over the game names does not import worlds, while iterating over values()
+    and items() imports each world as it is reached.
+    """
+    loaders: Dict[str, Callable[[], None]]
+    """Loaders of the games that are known but not imported yet."""
+    infos: Dict[str, Dict[str, Any]]
+    """Information about the games that are not imported yet, see worlds.get_world_index_entry."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.loaders = {}
+        self.infos = {}
+
+    def __setitem__(self, game: str, world_type: Type[World]) -> None:
+        self.loaders.pop(game, None)
+        self.infos.pop(game, None)
+        super().__setitem__(game, world_type)
+
+    def register_lazy(self, game: str, loader: Callable[[], None], info: Dict[str, Any]) -> None:
+        self.loaders[game] = loader
+        self.infos[game] = info
+
+    def _load(self, game: str) -> bool:
+        loader = self.loaders.pop(game, None)
+        if loader:
+            self.infos.pop(game, None)
+            loader()
+        return super().__contains__(game)
+
+    def load_all(self) -> None:
+        for game in list(self.loaders):
+            self._load(game)
+
+    def __missing__(self, game: str) -> Type[World]:
+        if self._load(game):
+            return super().__getitem__(game)
+        raise KeyError(game)
+
+    def __contains__(self, game: object) -> bool:
+        return super().__contains__(game) or game in self.loaders
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([*super().keys(), *self.loaders])
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self.loaders)
+
+    def get(self, game: str, default: Any = None) -> Any:
+        try:
+            return self[game]
+        except KeyError:
+            return default
+
+    def copy(self) -> WorldTypes:
+        copied = WorldTypes()
+        dict.update(copied, dict.items(self))
+        copied.loaders.update(self.loaders)
+        copied.infos.update(self.infos)
+        return copied
+
+    def keys(self) -> KeysView[str]:
+        return KeysView(self)
+
+    def values(self) -> ValuesView[Type[World]]:
+        return LazyValuesView(self)
+
+    def items(self) -> ItemsView[str, Type[World]]:
+        return LazyItemsView(self)
+
+
 class AutoWorldRegister(type):
-    world_types: Dict[str, Type[World]] = {}
+    world_types: WorldTypes = WorldTypes()
     __file__: str
     zip_path: Optional[str]
     settings_key: str
@@ -85,11 +183,16 @@ class AutoWorldRegister(type):
                 raise RuntimeError(f"{name} is attempting to set 'world_version' from within the class. world_version "
                                    f"can only be set from manifest.")
 
+        # remove() can't be assumed to undo collect() anymore once either of them is changed
+        if "reversible_collection" not in dct and not {"collect", "remove", "collect_item"}.isdisjoint(dct):
+            dct["reversible_collection"] = False
+
         # construct class
         new_class = super().__new__(mcs, name, bases, dct)
         new_class.__file__ = sys.modules[new_class.__module__].__file__
         if "game" in dct:
-            if dct["game"] in AutoWorldRegister.world_types:
+            # games not imported yet are registered by their import
+            if dict.__contains__(AutoWorldRegister.world_types, dct["game"]):
                 raise RuntimeError(f"""Game {dct["game"]} already registered in 
                 {AutoWorldRegister.world_types[dct["game"]].__file__} when attempting to register from
                 {new_class.__file__}.""")
@@ -168,6 +271,8 @@ def _timed_call(method: Callable[..., Any], *args: Any,
     start = time.perf_counter()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if multiworld and multiworld.profiler:
+        multiworld.profiler.add_time(method.__qualname__ if player is None else method.__name__, taken, player)
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -197,12 +302,73 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
         return ret
 
 
+isolatable_stages: FrozenSet[str] = frozenset({"generate_early", "create_regions", "create_items", "set_rules"})
+"""Generation steps that may be run concurrently for worlds that declare them in `World.isolated_stages`."""
+
+
+def _call_isolated_single(multiworld: "MultiWorld", method_name: str, player: int, itempool: List["Item"],
+                          *args: Any) -> List["Item"]:
+    """Runs a step for a single player, with only the player's items as the itempool, and returns the resulting
+    itempool."""
+    multiworld.random.block_current_thread()
+    multiworld._thread_itempool.items = itempool
+    try:
+        call_single(multiworld, method_name, player, *args)
+        return multiworld.itempool
+    finally:
+        del multiworld._thread_itempool.items
+        multiworld.random.block_current_thread(False)
+
+
+def _call_isolated(multiworld: "MultiWorld", executor: Executor, method_name: str, players: List[int],
+                   *args: Any) -> Dict[int, List["Item"]]:
+    """Runs a step for the given players concurrently and returns the itempool each of them ended up with.
+    Each world starts out with only its own items as the itempool, so none of them modify the shared itempool."""
+    player_items: Dict[int, List["Item"]] = {player: [] for player in players}
+    for item in multiworld.itempool:
+        if item.player in player_items:
+            player_items[item.player].append(item)
+    futures = {player: executor.submit(_call_isolated_single, multiworld, method_name, player,
+                                       player_items[player].copy(), *args)
+               for player in players}
+    wait(futures.values())
+
+    results: Dict[int, List["Item"]] = {}
+    for player, future in futures.items():
+        results[player] = future.result()
+        for item in results[player]:
+            if item.player != player:
+                raise RuntimeError(f"Item \"{item.name}\" of player {item.player} was added to the itempool during "
+                                   f"the isolated {method_name} step of another world.")
+
+    # Items the worlds removed are taken out of the shared itempool here, items they added get appended in player order
+    previous_items = {id(item) for items in player_items.values() for item in items}
+    kept_items = {id(item) for items in results.values() for item in items}
+    if not previous_items <= kept_items:
+        multiworld.itempool = [item for item in multiworld.itempool
+                               if id(item) not in previous_items or id(item) in kept_items]
+    return {player: [item for item in items if id(item) not in previous_items] for player, items in results.items()}
+
+
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
+    start = time.perf_counter()
     world_types: Set[AutoWorldRegister] = set()
+    isolated_items: Dict[int, List["Item"]] = {}
+    if multiworld.stage_executor and method_name in isolatable_stages:
+        isolated_players = [player for player in multiworld.player_ids
+                            if method_name in multiworld.worlds[player].isolated_stages]
+        if len(isolated_players) > 1:
+            # regions are only added to the caches of their own player, so only the itempool has to be merged
+            isolated_items = _call_isolated(multiworld, multiworld.stage_executor, method_name, isolated_players,
+                                            *args)
+
     for player in multiworld.player_ids:
         prev_item_count = len(multiworld.itempool)
         world_types.add(multiworld.worlds[player].__class__)
-        call_single(multiworld, method_name, player, *args)
+        if player in isolated_items:
+            multiworld.itempool += isolated_items[player]
+        else:
+            call_single(multiworld, method_name, player, *args)
         if __debug__:
             new_items = multiworld.itempool[prev_item_count:]
             for i, item in enumerate(new_items):
@@ -212,6 +378,8 @@ def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
                         f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
 
     call_stage(multiworld, method_name, *args)
+    if multiworld.profiler:
+        multiworld.profiler.add_stage_time(method_name, time.perf_counter() - start)
 
 
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
@@ -219,7 +387,7 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     for world_type in sorted(world_types, key=lambda world: world.__name__):
         stage_callable = getattr(world_type, f"stage_{method_name}", None)
         if stage_callable:
-            _timed_call(stage_callable, multiworld, *args)
+            _timed_call(stage_callable, multiworld, *args, multiworld=multiworld)
 
 
 class WebWorld(metaclass=WebWorldRegister):
@@ -319,6 +487,20 @@ class World(metaclass=AutoWorldRegister):
     origin_region_name: str = "Menu"
     """Name of the Region from which accessibility is tested."""
 
+    isolated_stages: ClassVar[FrozenSet[str]] = frozenset()
+    """Names of the generation steps of this world that only read and modify the data of its own player.
+    When generating with multiple stage threads, these steps are run concurrently with those of other worlds.
+    Only generate_early, create_regions, create_items and set_rules can be isolated. While an isolated step runs,
+    multiworld.itempool only holds the items of its own world, and multiworld.random can not be used. Isolated steps
+    must not add items of other players to the itempool, or regions of other players to the multiworld.
+    Running steps concurrently only speeds up generation on free-threaded Python builds."""
+
+    reversible_collection: ClassVar[bool] = True
+    """If True, remove() exactly undoes collect() for the items of this world, and the resulting state does not depend
+    on the order its items were collected in. For the items of these worlds, fill updates the states it explores from
+    by collecting and removing the items that changed, instead of collecting every remaining item again for each
+    placement. Defaults to False for worlds that override collect(), remove() or collect_item()."""
+
     explicit_indirect_conditions: bool = True
     """If True, the world implementation is supposed to use MultiWorld.register_indirect_condition() correctly.
     If False, everything is rechecked at every step, which is slower computationally, 
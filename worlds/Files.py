@@ -61,7 +61,9 @@ class AutoPatchRegister(abc.ABCMeta):
 
     @staticmethod
     def get_handler(file: str) -> Optional[AutoPatchRegister]:
+        from . import load_registered_worlds
         _, suffix = os.path.splitext(file)
+        load_registered_worlds("patch_suffixes", suffix)  # containers are registered when their world is imported
         return AutoPatchRegister.file_endings.get(suffix, None)
 
 
@@ -80,10 +82,13 @@ class AutoPatchExtensionRegister(abc.ABCMeta):
     def get_handler(game: Optional[str]) -> Union[AutoPatchExtensionRegister, List[AutoPatchExtensionRegister]]:
         if not game:
             return APPatchExtension
+        from . import load_registered_worlds
+        load_registered_worlds("patch_extensions", game)  # extensions are registered when their world is imported
         handler = AutoPatchExtensionRegister.extension_types.get(game, APPatchExtension)
         if handler.required_extensions:
             handlers = [handler]
             for required in handler.required_extensions:
+                load_registered_worlds("patch_extensions", required)
                 ext = AutoPatchExtensionRegister.extension_types.get(required)
                 if not ext:
                     raise NotImplementedError(f"No handler for {required}.")
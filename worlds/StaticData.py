@@ -0,0 +1,165 @@
+import gc
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+from io import BytesIO
+from typing import Any, Callable, Optional, TypeVar
+
+from Utils import RestrictedPickler, cache_path, safe_builtins, version_tuple
+
+__all__ = ["cache_static_data"]
+
+RetType = TypeVar("RetType")
+
+static_data_version = 1
+"""Version of the format of cached static data, changing it invalidates every cached file."""
+static_data_builtins = safe_builtins | {"dict", "list", "tuple", "int", "float", "str", "bytes", "bool"}
+static_data_collections = frozenset(("defaultdict", "OrderedDict", "Counter", "deque"))
+static_data_core_classes = frozenset(("ItemClassification", "LocationProgressType"))
+
+
+class StaticDataUnpickler(pickle.Unpickler):
+    """
+    Unpickler that only loads basic types and classes defined in the imported modules of the world package
+    the static data belongs to.
+    """
+
+    def __init__(self, file: Any, package: str) -> None:
+        super().__init__(file)
+        self.package = package
+
+    def find_class(self, module: str, name: str) -> Any:
+        if (module == self.package or module.startswith(self.package + ".")) and "." not in name:
+            # only look at modules imported already, loading data must not import anything
+            cls = getattr(sys.modules.get(module), name, None)
+            # the module has to define the class, not just import it
+            if isinstance(cls, type) and cls.__module__ == module and cls.__qualname__ == name:
+                return cls
+        if module == "builtins" and name in static_data_builtins:
+            return super().find_class(module, name)
+        if module == "collections" and name in static_data_collections:
+            return super().find_class(module, name)
+        if module == "BaseClasses" and name in static_data_core_classes:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"global '{module}.{name}' is forbidden")
+
+
+def _get_world_source_signature(package: str) -> Optional[list[int]]:
+    """Returns the signature of the world source providing the world package, or None if it is not a world source."""
+    import worlds
+    package_file = getattr(sys.modules.get(package), "__file__", None)
+    if not package_file:
+        return None
+    package_file = os.path.normcase(os.path.abspath(package_file))
+    for source in worlds.world_sources:
+        path = os.path.normcase(os.path.abspath(source.resolved_path))
+        if package_file.startswith(path + os.sep):
+            return worlds.world_index_key["sources"].get(source.resolved_path)
+    return None
+
+
+def _get_cache_file(function: Callable[[], Any]) -> Optional[tuple[str, str]]:
+    """Returns the world package of a builder and the file caching its result, which is named after its key."""
+    parts = function.__module__.split(".")
+    if len(parts) < 2 or parts[0] != "worlds":
+        return None
+    package = ".".join(parts[:2])
+    signature = _get_world_source_signature(package)
+    if signature is None:
+        return None
+    key = json.dumps([static_data_version, version_tuple.as_simple_string(), sys.version, signature,
+                      function.__module__, function.__qualname__])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return package, cache_path("static_data", f"{function.__module__}.{function.__qualname__}.{digest}.pickle")
+
+
+_uncacheable = object()
+"""Returned by _load for data that was found not to load back from the cache, recorded as an empty file."""
+
+
+def _load(package: str, file_name: str) -> Any:
+    # loading creates many objects at once, which would trigger garbage collections that can't find anything
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(file_name, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return _uncacheable
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return StaticDataUnpickler(data, package).load()
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _store(package: str, file_name: str, value: Any) -> None:
+    """
+    Store value to file_name and remove files cached by the same builder for other keys.
+    If value can't be pickled or would not load back, an empty file is stored instead, so it is built without trying to
+    cache it next time.
+    """
+    folder, name = os.path.split(file_name)
+    temp_name = None
+    try:
+        os.makedirs(folder, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=folder, delete=False) as f:
+            temp_name = f.name
+            try:
+                RestrictedPickler(f, pickle.HIGHEST_PROTOCOL, StaticDataUnpickler(BytesIO(), package)).dump(value)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                logging.debug(f"Static data of {file_name} can't be cached: {e}")
+                f.seek(0)
+                f.truncate()
+        os.replace(temp_name, file_name)
+        temp_name = None
+        prefix = name.rsplit(".", 2)[0] + "."
+        for entry in os.scandir(folder):
+            if entry.name.startswith(prefix) and len(entry.name) == len(name) and entry.name != name:
+                os.remove(entry.path)
+    except OSError as e:
+        logging.debug(f"Could not cache static data in {file_name}: {e}")
+        if temp_name:
+            try:
+                os.remove(temp_name)
+            except OSError:
+                pass
+
+
+def cache_static_data(function: Callable[[], RetType]) -> Callable[[], RetType]:
+    """
+    Decorator for functions of a world that build static data, such as tables parsed from its data files.
+
+    The result is kept like with Utils.cache_argsless and stored in the user's cache directory. Later runs load it
+    from there for as long as the world source, Archipelago and Python don't change.
+    The result has to be picklable and may only refer to classes defined in its world and basic containers,
+    otherwise it is built on every run.
+    """
+    assert not function.__code__.co_argcount, "Can only cache 0 argument functions with this cache."
+
+    sentinel = object()
+    result: Any = sentinel
+
+    def _wrap() -> RetType:
+        nonlocal result
+        if result is sentinel:
+            cache_file = _get_cache_file(function)
+            if cache_file:
+                package, file_name = cache_file
+                try:
+                    result = _load(package, file_name)
+                except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+                    result = function()
+                    _store(package, file_name, result)
+                else:
+                    if result is _uncacheable:
+                        result = function()
+            else:
+                result = function()
+        return result
+
+    return _wrap
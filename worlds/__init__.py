@@ -8,13 +8,19 @@ import zipimport
 import time
 import dataclasses
 import json
+from functools import partial
 from pathlib import Path
 from types import ModuleType
-from typing import List, Sequence
+from collections.abc import ItemsView, Iterator, KeysView, ValuesView
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence
 from zipfile import BadZipFile
 
-from NetUtils import DataPackage
-from Utils import local_path, user_path, Version, version_tuple, tuplize_version, messagebox
+from NetUtils import DataPackage, GamesPackage
+from Utils import cache_path, local_path, user_path, Version, version_tuple, tuplize_version, messagebox, \
+    load_data_package_for_checksum, store_data_package_for_checksum
+
+if TYPE_CHECKING:
+    from .AutoWorld import World
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -30,6 +36,9 @@ __all__ = [
     "local_folder",
     "user_folder",
     "failed_world_loads",
+    "load_all_worlds",
+    "load_registered_worlds",
+    "get_world_infos",
 ]
 
 
@@ -43,6 +52,7 @@ class WorldSource:
     relative: bool = True  # relative to regular world import folder
     time_taken: float = -1.0
     version: Version = Version(0, 0, 0)
+    loaded: bool = False
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.path}, is_zip={self.is_zip}, relative={self.relative})"
@@ -58,6 +68,7 @@ class WorldSource:
             start = time.perf_counter()
             importlib.import_module(f".{Path(self.path).stem}", "worlds")
             self.time_taken = time.perf_counter()-start
+            self.loaded = True
             return True
 
         except Exception:
@@ -91,121 +102,417 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
-# import all submodules to trigger AutoWorldRegister
 world_sources.sort()
-apworlds: list[WorldSource] = []
-for world_source in world_sources:
-    # load all loose files first:
-    if world_source.is_zip:
-        apworlds.append(world_source)
-    else:
-        world_source.load()
-
-from .AutoWorld import AutoWorldRegister
-
-for world_source in world_sources:
-    if not world_source.is_zip:
-        # look for manifest
-        manifest = {}
-        for dirpath, dirnames, filenames in os.walk(world_source.resolved_path):
-            for file in filenames:
-                if file.endswith("archipelago.json"):
-                    with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
-                        manifest = json.load(manifest_file)
-                    break
-            if manifest:
+
+from .AutoWorld import AutoWorldRegister, LazyItemsView, LazyValuesView
+
+world_index_version = 2
+"""Version of the format of the world index, see get_world_index_entry."""
+world_index_path = cache_path("world_index.json")
+
+
+def _get_source_signature(source: WorldSource) -> list[int]:
+    """Returns the newest modification time and the number of files of a world source, which change with its code."""
+    path = source.resolved_path
+    if source.is_zip:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    newest = 0
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = [name for name in dirnames if name != "__pycache__"]
+        newest = max(newest, os.stat(dirpath).st_mtime_ns)
+        for name in filenames:
+            newest = max(newest, os.stat(os.path.join(dirpath, name)).st_mtime_ns)
+        count += len(filenames)
+    return [newest, count]
+
+
+def _get_index_key() -> dict[str, Any]:
+    """Returns what a world index is only valid for, including the code that registers and describes worlds."""
+    return {
+        "version": world_index_version,
+        "core": [version_tuple.as_simple_string(), sys.version,
+                 *(os.stat(os.path.join(local_folder, file)).st_mtime_ns for file in ("__init__.py", "AutoWorld.py"))],
+        "sources": {source.resolved_path: _get_source_signature(source) for source in world_sources},
+    }
+
+
+def get_world_index_entry(world_type: type["World"]) -> dict[str, Any]:
+    """
+    Returns what the world index stores about a world, so it can be described without importing it:
+    its data package checksum, version, whether it is hidden, its numbers of items and locations
+    and the key and class path of its settings, if any.
+    """
+    settings_annotation = world_type.__annotations__.get("settings", None)
+    has_settings = settings_annotation is not None and settings_annotation != "ClassVar[Optional['Group']]"
+    return {
+        "checksum": network_data_package["games"][world_type.game]["checksum"],
+        "world_version": world_type.world_version.as_simple_string(),
+        "hidden": world_type.hidden,
+        "items": len(world_type.item_names),
+        "locations": len(world_type.location_names),
+        "settings": [world_type.settings_key, f"{world_type.__module__}.{world_type.__name__}"]
+        if has_settings else None,
+    }
+
+
+def get_world_infos() -> dict[str, dict[str, Any]]:
+    """Returns the world index entry of every game by name, without importing worlds that are not imported yet."""
+    world_types = AutoWorldRegister.world_types
+    infos = {game: get_world_index_entry(world_type) for game, world_type in dict.items(world_types)}
+    infos.update(getattr(world_types, "infos", {}))
+    return dict(sorted(infos.items()))
+
+
+def _read_world_index(index_key: dict[str, Any]) -> dict[str, Any] | None:
+    try:
+        with open(world_index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("key") != index_key:
+        return None
+    return index
+
+
+def _get_registrations() -> list[tuple[str, str, str]]:
+    """
+    Returns what imported modules registered in the registries that are looked up without knowing the game,
+    as the kind of registration, its key and the module of the registered class.
+    """
+    registrations: list[tuple[str, str, str]] = []
+    files = sys.modules.get("worlds.Files")
+    if files:
+        for suffix, container in files.AutoPatchRegister.file_endings.items():
+            registrations.append(("patch_suffixes", suffix, container.__module__))
+        for game, extension in files.AutoPatchExtensionRegister.extension_types.items():
+            registrations.append(("patch_extensions", game, extension.__module__))
+    sni_client = sys.modules.get("worlds.AutoSNIClient")
+    if sni_client:
+        for game, handler in sni_client.AutoSNIClientRegister.game_handlers.items():
+            registrations.append(("sni_clients", game, type(handler).__module__))
+    bizhawk_client = sys.modules.get("worlds._bizhawk.client")
+    if bizhawk_client:
+        for systems, handlers in bizhawk_client.AutoBizHawkClientRegister.game_handlers.items():
+            for handler in handlers.values():
+                registrations.extend(("bizhawk_systems", system, type(handler).__module__) for system in systems)
+    return registrations
+
+
+def _write_world_index(index_key: dict[str, Any]) -> None:
+    """
+    Store the games provided by each imported world source, what it registered for patches and clients
+    and the data packages of its games in the cache.
+    """
+    module_sources = {f"worlds.{Path(source.path).stem}": source for source in world_sources}
+    sources: dict[str, dict[str, Any]] = {source.resolved_path: {"games": {}, "registrations": {}}
+                                          for source in world_sources if source.loaded}
+    for game, world_type in AutoWorldRegister.world_types.items():
+        source = module_sources.get(".".join(world_type.__module__.split(".")[:2]))
+        if not source:
+            # the index could not tell which source provides the game, so it would be missing on the next start
+            logging.debug(f"Not writing world index, {game} was registered by {world_type.__module__}, "
+                          f"which is not part of a world source.")
+            return
+        if not source.loaded:
+            continue  # failed after registering, imported again on next start
+        sources[source.resolved_path]["games"][game] = get_world_index_entry(world_type)
+        store_data_package_for_checksum(game, network_data_package["games"][game])
+    for kind, key, module in _get_registrations():
+        source = module_sources.get(".".join(module.split(".")[:2]))
+        if source and source.loaded:
+            keys: list[str] = sources[source.resolved_path]["registrations"].setdefault(kind, [])
+            if key not in keys:
+                keys.append(key)
+    try:
+        os.makedirs(os.path.dirname(world_index_path), exist_ok=True)
+        with open(world_index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"key": index_key, "sources": sources}, f)
+        os.replace(world_index_path + ".tmp", world_index_path)
+    except OSError as e:
+        logging.debug(f"Could not write world index: {e}")
+
+
+def _load_loose_world_versions(world_source: WorldSource) -> None:
+    """Set the world_version of the games of a loose world source from its manifest."""
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(world_source.resolved_path):
+        for file in filenames:
+            if file.endswith("archipelago.json"):
+                with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
+                    manifest = json.load(manifest_file)
                 break
-        game = manifest.get("game")
-        if game in AutoWorldRegister.world_types:
-            AutoWorldRegister.world_types[game].world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
-
-if apworlds:
-    # encapsulation for namespace / gc purposes
-    def load_apworlds() -> None:
-        global apworlds
-        from .Files import APWorldContainer, InvalidDataError
-        core_compatible: list[tuple[WorldSource, APWorldContainer]] = []
-
-        def fail_world(game_name: str, reason: str, add_as_failed_to_load: bool = True) -> None:
-            if add_as_failed_to_load:
-                failed_world_loads.append(game_name)
-            logging.warning(reason)
-
-        for apworld_source in apworlds:
-            apworld: APWorldContainer = APWorldContainer(apworld_source.resolved_path)
-            # populate metadata
-            try:
-                apworld.read()
-            except InvalidDataError as e:
-                if version_tuple < (0, 7, 0):
-                    logging.error(
-                        f"Invalid or missing manifest file for {apworld_source.resolved_path}. "
-                        "This apworld will stop working with Archipelago 0.7.0."
-                    )
-                    logging.error(e)
-                else:
-                    raise e
-            except BadZipFile as e:
-                err_message = (f"The world source {apworld_source.resolved_path} is not a valid zip. "
-                               "It is likely either corrupted, or was packaged incorrectly.")
+        if manifest:
+            break
+    game = manifest.get("game")
+    if game in AutoWorldRegister.world_types:
+        AutoWorldRegister.world_types[game].world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
+
+
+apworld_module_specs: dict[str, importlib.machinery.ModuleSpec | None] = {}
 
-                if sys.stdout:
-                    raise RuntimeError(err_message) from e
-                else:
-                    messagebox("Couldn't load worlds", err_message, error=True)
-                    sys.exit(1)
-
-            if apworld.minimum_ap_version and apworld.minimum_ap_version > version_tuple:
-                fail_world(apworld.game,
-                           f"Did not load {apworld_source.path} "
-                           f"as its minimum core version {apworld.minimum_ap_version} "
-                           f"is higher than current core version {version_tuple}.")
-            elif apworld.maximum_ap_version and apworld.maximum_ap_version < version_tuple:
-                fail_world(apworld.game,
-                           f"Did not load {apworld_source.path} "
-                           f"as its maximum core version {apworld.maximum_ap_version} "
-                           f"is lower than current core version {version_tuple}.")
-            else:
-                core_compatible.append((apworld_source, apworld))
-        # load highest version first
-        core_compatible.sort(
-            key=lambda element: element[1].world_version if element[1].world_version else Version(0, 0, 0),
-            reverse=True)
-
-        apworld_module_specs = {}
-        class APWorldModuleFinder(importlib.abc.MetaPathFinder):
-            def find_spec(
-                    self, fullname: str, _path: Sequence[str] | None, _target: ModuleType = None
-            ) -> importlib.machinery.ModuleSpec | None:
-                return apworld_module_specs.get(fullname)
 
+class APWorldModuleFinder(importlib.abc.MetaPathFinder):
+    def find_spec(
+            self, fullname: str, _path: Sequence[str] | None, _target: ModuleType = None
+    ) -> importlib.machinery.ModuleSpec | None:
+        return apworld_module_specs.get(fullname)
+
+
+def _add_apworld_module_spec(apworld_source: WorldSource) -> None:
+    if not apworld_module_specs:
         sys.meta_path.insert(0, APWorldModuleFinder())
+    importer = zipimport.zipimporter(apworld_source.resolved_path)
+    world_name = Path(apworld_source.path).stem
+    apworld_module_specs[f"worlds.{world_name}"] = importer.find_spec(f"worlds.{world_name}")
+
+
+def load_apworlds(apworlds: list[WorldSource]) -> None:
+    from .Files import APWorldContainer, InvalidDataError
+    core_compatible: list[tuple[WorldSource, APWorldContainer]] = []
+
+    def fail_world(game_name: str, reason: str, add_as_failed_to_load: bool = True) -> None:
+        if add_as_failed_to_load:
+            failed_world_loads.append(game_name)
+        logging.warning(reason)
+
+    for apworld_source in apworlds:
+        apworld: APWorldContainer = APWorldContainer(apworld_source.resolved_path)
+        # populate metadata
+        try:
+            apworld.read()
+        except InvalidDataError as e:
+            if version_tuple < (0, 7, 0):
+                logging.error(
+                    f"Invalid or missing manifest file for {apworld_source.resolved_path}. "
+                    "This apworld will stop working with Archipelago 0.7.0."
+                )
+                logging.error(e)
+            else:
+                raise e
+        except BadZipFile as e:
+            err_message = (f"The world source {apworld_source.resolved_path} is not a valid zip. "
+                           "It is likely either corrupted, or was packaged incorrectly.")
 
-        for apworld_source, apworld in core_compatible:
-            if apworld.game and apworld.game in AutoWorldRegister.world_types:
-                fail_world(apworld.game,
-                           f"Did not load {apworld_source.path} "
-                           f"as its game {apworld.game} is already loaded.",
-                           add_as_failed_to_load=False)
+            if sys.stdout:
+                raise RuntimeError(err_message) from e
             else:
-                importer = zipimport.zipimporter(apworld_source.resolved_path)
-                world_name = Path(apworld.path).stem
+                messagebox("Couldn't load worlds", err_message, error=True)
+                sys.exit(1)
+
+        if apworld.minimum_ap_version and apworld.minimum_ap_version > version_tuple:
+            fail_world(apworld.game,
+                       f"Did not load {apworld_source.path} "
+                       f"as its minimum core version {apworld.minimum_ap_version} "
+                       f"is higher than current core version {version_tuple}.")
+        elif apworld.maximum_ap_version and apworld.maximum_ap_version < version_tuple:
+            fail_world(apworld.game,
+                       f"Did not load {apworld_source.path} "
+                       f"as its maximum core version {apworld.maximum_ap_version} "
+                       f"is lower than current core version {version_tuple}.")
+        else:
+            core_compatible.append((apworld_source, apworld))
+    # load highest version first
+    core_compatible.sort(
+        key=lambda element: element[1].world_version if element[1].world_version else Version(0, 0, 0),
+        reverse=True)
+
+    for apworld_source, apworld in core_compatible:
+        if apworld.game and apworld.game in AutoWorldRegister.world_types:
+            fail_world(apworld.game,
+                       f"Did not load {apworld_source.path} "
+                       f"as its game {apworld.game} is already loaded.",
+                       add_as_failed_to_load=False)
+        else:
+            _add_apworld_module_spec(apworld_source)
+            apworld_source.load()
+            if apworld.game in AutoWorldRegister.world_types:
+                # world could fail to load at this point
+                if apworld.world_version:
+                    AutoWorldRegister.world_types[apworld.game].world_version = apworld.world_version
+
+
+class IndexedGamesPackages(Dict[str, GamesPackage]):
+    """
+    The data packages of the games in the world index, loaded from the data package cache on first access,
+    or built from their world if it is imported, as the data of some worlds differs between processes.
+    Like AutoWorldRegister.world_types, iterating over values() and items() loads each of them as it is reached.
+    """
+    checksums: dict[str, str]
+    """Checksums of the games that are not loaded yet."""
+
+    def __init__(self, checksums: dict[str, str]) -> None:
+        super().__init__()
+        self.checksums = checksums
+
+    def _load(self, game: str) -> bool:
+        checksum = self.checksums.pop(game, None)
+        if checksum is not None and not super().__contains__(game):
+            game_package = {}
+            if not dict.__contains__(AutoWorldRegister.world_types, game):
+                game_package = load_data_package_for_checksum(game, checksum)
+            if game_package.get("checksum") != checksum:  # imported or not cached anymore
+                game_package = AutoWorldRegister.world_types[game].get_data_package_data()
+            super().__setitem__(game, game_package)
+        return super().__contains__(game)
+
+    def reset(self, game: str, checksum: str) -> None:
+        """Build the data package of a game from its world on next access, after its world was imported."""
+        if super().pop(game, None) is not None:
+            self.checksums[game] = checksum
+
+    def load_all(self) -> None:
+        for game in list(self.checksums):
+            self._load(game)
+
+    def __missing__(self, game: str) -> GamesPackage:
+        if self._load(game):
+            return super().__getitem__(game)
+        raise KeyError(game)
+
+    def __contains__(self, game: object) -> bool:
+        return super().__contains__(game) or game in self.checksums
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([*super().keys(), *self.checksums])
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self.checksums)
+
+    def get(self, game: str, default: Any = None) -> Any:
+        try:
+            return self[game]
+        except KeyError:
+            return default
+
+    def keys(self) -> KeysView[str]:
+        return KeysView(self)
+
+    def values(self) -> ValuesView[GamesPackage]:
+        return LazyValuesView(self)
+
+    def items(self) -> ItemsView[str, GamesPackage]:
+        return LazyItemsView(self)
+
+
+_source_loaders: dict[str, Callable[[], None]] = {}
+"""Loaders of the indexed world sources that are not imported yet, by path."""
+_source_registrations: dict[str, dict[str, list[str]]] = {}
+"""What the indexed world sources that are not imported yet registered for patches and clients, by path."""
+
+
+def _load_indexed_source(path: str) -> None:
+    _source_registrations.pop(path, None)
+    loader = _source_loaders.pop(path, None)
+    if loader:
+        loader()
+
+
+def _register_indexed_sources(index: dict[str, Any]) -> dict[str, str]:
+    """
+    Register the games of indexed world sources to be imported on first use and import the sources that are not
+    indexed, such as ones that failed to load. Returns the data package checksum of every indexed game.
+    """
+    checksums: dict[str, str] = {}
+    apworlds: list[WorldSource] = []
+    indexed: list[tuple[WorldSource, dict[str, Any]]] = []
+    for world_source in world_sources:
+        entry: dict[str, Any] | None = index["sources"].get(world_source.resolved_path)
+        if entry is not None:
+            indexed.append((world_source, entry))
+        elif world_source.is_zip:
+            apworlds.append(world_source)
+        else:
+            world_source.load()
+            _load_loose_world_versions(world_source)
+
+    # register loose files first, then apworlds from the highest version, like they are imported
+    indexed.sort(key=lambda element: max((tuplize_version(info["world_version"])
+                                           for info in element[1]["games"].values()), default=Version(0, 0, 0)),
+                 reverse=True)
+    indexed.sort(key=lambda element: element[0].is_zip)
+    for world_source, entry in indexed:
+        games: dict[str, dict[str, Any]] = entry["games"]
+        if f"worlds.{Path(world_source.path).stem}" in sys.modules:
+            continue  # imported by core already, such as generic
+        if any(game in AutoWorldRegister.world_types for game in games):
+            logging.warning(f"Did not load {world_source.path} as one of its games is already loaded.")
+            continue
+
+        def load(world_source: WorldSource = world_source, games: dict[str, dict[str, Any]] = games) -> None:
+            if world_source.is_zip:
+                _add_apworld_module_spec(world_source)
+            world_source.load()
+            for game, info in games.items():
+                if dict.__contains__(AutoWorldRegister.world_types, game):
+                    AutoWorldRegister.world_types[game].world_version = tuplize_version(info["world_version"])
+                    network_data_package["games"].reset(game, info["checksum"])
+
+        path = world_source.resolved_path
+        _source_loaders[path] = load
+        if entry["registrations"]:
+            _source_registrations[path] = entry["registrations"]
+        for game, info in games.items():
+            AutoWorldRegister.world_types.register_lazy(game, partial(_load_indexed_source, path), info)
+            checksums[game] = info["checksum"]
+    if apworlds:
+        load_apworlds(apworlds)
+    return checksums
+
+
+def load_registered_worlds(kind: str, key: str | None = None) -> None:
+    """
+    Import the world sources that registered the key, or anything if it is None, as one of these kinds in the world
+    index: "patch_suffixes", "patch_extensions" (by game), "sni_clients" (by game) or "bizhawk_systems".
+    """
+    for path, registrations in list(_source_registrations.items()):
+        keys = registrations.get(kind, ())
+        if keys and (key is None or key in keys):
+            _load_indexed_source(path)
+
+
+def load_all_worlds() -> None:
+    """Import every world, for features that need all worlds' side effects, such as launcher components."""
+    AutoWorldRegister.world_types.load_all()
+    for path in list(_source_loaders):
+        _load_indexed_source(path)
 
-                spec = importer.find_spec(f"worlds.{world_name}")
-                apworld_module_specs[f"worlds.{world_name}"] = spec
 
-                apworld_source.load()
-                if apworld.game in AutoWorldRegister.world_types:
-                    # world could fail to load at this point
-                    if apworld.world_version:
-                        AutoWorldRegister.world_types[apworld.game].world_version = apworld.world_version
-    load_apworlds()
-    del load_apworlds
+world_index_key = _get_index_key()
+world_index = _read_world_index(world_index_key)
+if world_index:
+    # Build the data package for each game lazily.
+    network_data_package: DataPackage = {
+        "games": IndexedGamesPackages(_register_indexed_sources(world_index)),
+    }
+    # Sources that are not indexed were imported, their games may have registered anyway.
+    for world_name, world in dict.items(AutoWorldRegister.world_types):
+        if world_name not in network_data_package["games"]:
+            network_data_package["games"][world_name] = world.get_data_package_data()
+else:
+    # import all submodules to trigger AutoWorldRegister
+    apworlds: list[WorldSource] = []
+    for world_source in world_sources:
+        # load all loose files first:
+        if world_source.is_zip:
+            apworlds.append(world_source)
+        else:
+            world_source.load()
 
-del apworlds
+    for world_source in world_sources:
+        if not world_source.is_zip:
+            _load_loose_world_versions(world_source)
 
-# Build the data package for each game.
-network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
-}
+    if apworlds:
+        load_apworlds(apworlds)
+    del apworlds
 
+    # Build the data package for each game.
+    network_data_package: DataPackage = {
+        "games": IndexedGamesPackages({}),
+    }
+    network_data_package["games"].update(
+        (world_name, world.get_data_package_data()) for world_name, world in AutoWorldRegister.world_types.items())
+    _write_world_index(world_index_key)
+del world_index
@@ -56,6 +56,8 @@ class AutoBizHawkClientRegister(abc.ABCMeta):
 
     @staticmethod
     async def get_handler(ctx: "BizHawkClientContext", system: str) -> BizHawkClient | None:
+        from .. import load_registered_worlds
+        load_registered_worlds("bizhawk_systems", system)  # clients are registered when their world is imported
         for systems, handlers in AutoBizHawkClientRegister.game_handlers.items():
             if system in systems:
                 for handler in handlers.values():
@@ -50,6 +50,11 @@ class APQuestWorld(World):
     # This defaults to "Menu", but you can change it by overriding origin_region_name.
     origin_region_name = "Overworld"
 
+    # If some of your steps only ever touch your own world's data, you can declare them as isolated.
+    # When generating with multiple stage threads, these steps may then run at the same time as other worlds' steps.
+    # This means they must not use multiworld.random or look at or modify anything belonging to other players.
+    isolated_stages = frozenset({"create_regions", "create_items", "set_rules"})
+
     # Our world class must have certain functions ("steps") that get called during generation.
     # The main ones are: create_regions, set_rules, create_items.
     # For better structure and readability, we put each of these in their own file.
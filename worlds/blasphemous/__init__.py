@@ -1,4 +1,4 @@
-from typing import Dict, List, Set, Any
+from typing import Dict, List, Set, Any, Tuple
 from collections import Counter
 from BaseClasses import Region, Location, Item, Tutorial, ItemClassification
 from Options import OptionError
@@ -9,7 +9,17 @@ from .Rules import BlasRules
 from worlds.generic.Rules import set_rule
 from .Options import BlasphemousOptions, blas_option_groups
 from .Vanilla import unrandomized_dict, junk_locations, thorn_set, skill_dict
-from .region_data import regions, locations
+from worlds.StaticData import cache_static_data
+
+
+@cache_static_data
+def get_region_data() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # region_data is too large to compile quickly when it can't be loaded from bytecode, such as from an apworld
+    from .region_data import regions, locations
+    return regions, locations
+
+
+regions, locations = get_region_data()
 
 class BlasphemousWeb(WebWorld):
     theme = "stone"
@@ -1,8 +1,10 @@
 import ast
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from inspect import signature, _ParameterKind
 import logging
 import re
+import threading
+from types import FunctionType
 
 from .Items import item_table
 from .Location import OOTLocation
@@ -30,6 +32,12 @@ kwarg_defaults = {
 
 allowed_globals = {'TimeOfDay': TimeOfDay}
 
+# Compiled rules of all players, by kwarg names and rule ast dump. Rules are bound to a player by their kwarg defaults.
+# Least recently used first, only the most recent compiled_rules_limit are kept.
+compiled_rules = OrderedDict()
+compiled_rules_limit = 4096  # about 700 rules per combination of settings
+compiled_rules_lock = threading.Lock()
+
 rule_aliases = {}
 nonaliases = set()
 
@@ -84,7 +92,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                     value=ast.Name(id='state', ctx=ast.Load()),
                     attr='has',
                     ctx=ast.Load()),
-                args=[ast.Str(escaped_items[node.id]), ast.Constant(self.player)],
+                args=[ast.Str(escaped_items[node.id]), ast.Name(id='player', ctx=ast.Load())],
                 keywords=[])
         elif node.id in self.world.__dict__:
             # Settings are constant
@@ -100,7 +108,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                     value=ast.Name(id='state', ctx=ast.Load()),
                     attr='has',
                     ctx=ast.Load()),
-                args=[ast.Str(node.id.replace('_', ' ')), ast.Constant(self.player)],
+                args=[ast.Str(node.id.replace('_', ' ')), ast.Name(id='player', ctx=ast.Load())],
                 keywords=[])
         else:
             raise Exception('Parse Error: invalid node name %s' % node.id, self.current_spot.name, ast.dump(node, False))
@@ -111,7 +119,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                 value=ast.Name(id='state', ctx=ast.Load()),
                 attr='has',
                 ctx=ast.Load()),
-            args=[ast.Str(node.s), ast.Constant(self.player)],
+            args=[ast.Str(node.s), ast.Name(id='player', ctx=ast.Load())],
             keywords=[])
 
     # python 3.8 compatibility: ast walking now uses visit_Constant for Constant subclasses
@@ -150,7 +158,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                 value=ast.Name(id='state', ctx=ast.Load()),
                 attr='has',
                 ctx=ast.Load()),
-            args=[ast.Str(iname), ast.Constant(self.player), count],
+            args=[ast.Str(iname), ast.Name(id='player', ctx=ast.Load()), count],
             keywords=[])
 
 
@@ -221,7 +229,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                                 ctx=ast.Load()),
                             attr='worlds',
                             ctx=ast.Load()),
-                        slice=ast.Index(value=ast.Constant(self.player)),
+                        slice=ast.Index(value=ast.Name(id='player', ctx=ast.Load())),
                         ctx=ast.Load()),
                     attr=node.value.id,
                     ctx=ast.Load()),
@@ -325,7 +333,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                     value=ast.Name(id='state', ctx=ast.Load()),
                     attr='has_any' if early_return else 'has_all',
                     ctx=ast.Load()),
-                args=[ast.Tuple(elts=[ast.Str(i) for i in items], ctx=ast.Load()), ast.Constant(self.player)],
+                args=[ast.Tuple(elts=[ast.Str(i) for i in items], ctx=ast.Load()), ast.Name(id='player', ctx=ast.Load())],
                 keywords=[])] + new_values
         else:
             node.values = new_values
@@ -341,8 +349,8 @@ class Rule_AST_Transformer(ast.NodeTransformer):
         if not hasattr(State, name):
             raise Exception('Parse Error: No such function State.%s' % name, self.current_spot.name, ast.dump(node, False))
 
-        for (k, v) in self.kwarg_defaults.items():
-            keywords.append(ast.keyword(arg=f'{k}', value=ast.Constant(v)))
+        for k in self.kwarg_defaults:
+            keywords.append(ast.keyword(arg=f'{k}', value=ast.Name(id=k, ctx=ast.Load())))
 
         return ast.Call(
             func=ast.Attribute(
@@ -367,7 +375,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                 value=ast.Name(id='state', ctx=ast.Load()),
                 attr='has',
                 ctx=ast.Load()),
-            args=[ast.Str(subrule_name), ast.Constant(self.player)],
+            args=[ast.Str(subrule_name), ast.Name(id='player', ctx=ast.Load())],
             keywords=[])
         # Cache the subrule for any others in this region
         # (and reserve the item name in the process)
@@ -403,25 +411,40 @@ class Rule_AST_Transformer(ast.NodeTransformer):
     def make_access_rule(self, body):
         rule_str = ast.dump(body, False)
         if rule_str not in self.rule_cache:
-            # requires consistent iteration on dicts
-            kwargs = [ast.arg(arg=k) for k in self.kwarg_defaults.keys()]
-            kwd = list(map(ast.Constant, self.kwarg_defaults.values()))
-            try:
-                self.rule_cache[rule_str] = eval(compile(
-                    ast.fix_missing_locations(
-                        ast.Expression(ast.Lambda(
-                            args=ast.arguments(
-                                posonlyargs=[],
-                                args=[ast.arg(arg='state')],
-                                defaults=[],
-                                kwonlyargs=kwargs,
-                                kw_defaults=kwd),
-                            body=body))),
-                    '<string>', 'eval'),
-                    # globals/locals. if undefined, everything in the namespace *now* would be allowed
-                    allowed_globals)
-            except TypeError as e:
-                raise Exception('Parse Error: %s' % e, self.current_spot.name, ast.dump(body, False))
+            # rule bodies refer to the player through the player kwarg, so they are the same for every player
+            # with the same settings. Only compiling them is shared, each player gets a copy with its own defaults.
+            key = (tuple(self.kwarg_defaults), rule_str)
+            with compiled_rules_lock:
+                compiled = compiled_rules.get(key)
+                if compiled is not None:
+                    compiled_rules.move_to_end(key)
+            if compiled is None:
+                # requires consistent iteration on dicts
+                kwargs = [ast.arg(arg=k) for k in self.kwarg_defaults.keys()]
+                kwd = list(map(ast.Constant, self.kwarg_defaults.values()))
+                try:
+                    compiled = eval(compile(
+                        ast.fix_missing_locations(
+                            ast.Expression(ast.Lambda(
+                                args=ast.arguments(
+                                    posonlyargs=[],
+                                    args=[ast.arg(arg='state')],
+                                    defaults=[],
+                                    kwonlyargs=kwargs,
+                                    kw_defaults=kwd),
+                                body=body))),
+                        '<string>', 'eval'),
+                        # globals/locals. if undefined, everything in the namespace *now* would be allowed
+                        allowed_globals)
+                except TypeError as e:
+                    raise Exception('Parse Error: %s' % e, self.current_spot.name, ast.dump(body, False))
+                with compiled_rules_lock:
+                    compiled_rules[key] = compiled
+                    while len(compiled_rules) > compiled_rules_limit:
+                        compiled_rules.popitem(last=False)
+            rule = FunctionType(compiled.__code__, allowed_globals, compiled.__name__)
+            rule.__kwdefaults__ = self.kwarg_defaults.copy()
+            self.rule_cache[rule_str] = rule
         return self.rule_cache[rule_str]
 
 
@@ -494,20 +517,20 @@ class Rule_AST_Transformer(ast.NodeTransformer):
     # Hijacking functions
     def current_spot_child_access(self, node): 
         r = self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region
-        return ast.parse(f"state._oot_reach_as_age('{r.name}', 'child', {self.player})", mode='eval').body
+        return ast.parse(f"state._oot_reach_as_age('{r.name}', 'child', player)", mode='eval').body
 
     def current_spot_adult_access(self, node): 
         r = self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region
-        return ast.parse(f"state._oot_reach_as_age('{r.name}', 'adult', {self.player})", mode='eval').body
+        return ast.parse(f"state._oot_reach_as_age('{r.name}', 'adult', player)", mode='eval').body
 
     def current_spot_starting_age_access(self, node): 
         return self.current_spot_child_access(node) if self.world.starting_age == 'child' else self.current_spot_adult_access(node)
 
     def has_bottle(self, node): 
-        return ast.parse(f"state._oot_has_bottle({self.player})", mode='eval').body
+        return ast.parse("state._oot_has_bottle(player)", mode='eval').body
 
     def can_live_dmg(self, node):
-        return ast.parse(f"state._oot_can_live_dmg({self.player}, {node.args[0].value})", mode='eval').body
+        return ast.parse(f"state._oot_can_live_dmg(player, {node.args[0].value})", mode='eval').body
 
     def region_has_shortcuts(self, node):
-        return ast.parse(f"state._oot_region_has_shortcuts({self.player}, '{node.args[0].value}')", mode='eval').body
+        return ast.parse(f"state._oot_region_has_shortcuts(player, '{node.args[0].value}')", mode='eval').body
@@ -12,6 +12,7 @@ import pkgutil
 import pkg_resources
 
 from BaseClasses import ItemClassification
+from worlds.StaticData import cache_static_data
 
 
 BASE_OFFSET = 3860000
@@ -338,9 +339,12 @@ def load_json_data(data_name: str) -> Union[List[Any], Dict[str, Any]]:
     return orjson.loads(pkgutil.get_data(__name__, "data/" + data_name).decode("utf-8-sig"))
 
 
-def _init() -> None:
+@cache_static_data
+def _init() -> PokemonEmeraldData:
     import re
 
+    data = PokemonEmeraldData()
+
     extracted_data: Dict[str, Any] = load_json_data("extracted_data.json")
     data.constants = extracted_data["constants"]
     data.ram_addresses = extracted_data["misc_ram_addresses"]
@@ -1470,9 +1474,10 @@ def _init() -> None:
             trainer_json["battle_type"]
         ))
 
+    return data
+
 
-data = PokemonEmeraldData()
-_init()
+data = _init()
 
 LEGENDARY_POKEMON = frozenset([data.constants[species] for species in [
     "SPECIES_ARTICUNO",
@@ -1,7 +1,7 @@
 from collections import Counter, defaultdict
 from typing import Any, Dict, FrozenSet, List, Optional, Set
 
-from Utils import cache_argsless
+from worlds.StaticData import cache_static_data
 
 from .definition_classes import AreaDefinition, ConnectionDefinition, RegionDefinition, WitnessRule
 from .item_definition_classes import (
@@ -344,22 +344,22 @@ def get_parent_progressive_item(item_name: str) -> str:
     return _progressive_lookup.get(item_name, item_name)
 
 
-@cache_argsless
+@cache_static_data
 def get_vanilla() -> StaticWitnessLogicObj:
     return StaticWitnessLogicObj(get_vanilla_logic())
 
 
-@cache_argsless
+@cache_static_data
 def get_sigma_normal() -> StaticWitnessLogicObj:
     return StaticWitnessLogicObj(get_sigma_normal_logic())
 
 
-@cache_argsless
+@cache_static_data
 def get_sigma_expert() -> StaticWitnessLogicObj:
     return StaticWitnessLogicObj(get_sigma_expert_logic())
 
 
-@cache_argsless
+@cache_static_data
 def get_umbra_variety() -> StaticWitnessLogicObj:
     return StaticWitnessLogicObj(get_umbra_variety_logic())
 